@@ -0,0 +1,106 @@
+from tempfile import TemporaryDirectory
+from pathlib import Path
+
+import ytmb.utils
+import ytmb.authentication as auth
+
+
+class FakeClient:
+    def __init__(self, playlists=None) -> None:
+        self.playlists = {}
+        self.num_set = 0
+        self.writes = []
+        self.fail_at = None
+        self.fail_after_write = False
+        self.home = []
+        self.num_home_calls = 0
+        for playlistId, videoIds in (playlists or {}).items():
+            self.playlists[playlistId] = [self._item(v) for v in videoIds]
+
+    def _item(self, videoId) -> dict:
+        self.num_set += 1
+        return {
+            'videoId': videoId,
+            'title': videoId,
+            'artists': [],
+            'setVideoId': f'set{self.num_set}',
+        }
+
+    def _write(self, write, apply):
+        fail = self.fail_at == len(self.writes)
+        if fail:
+            self.fail_at = None
+        if fail and not self.fail_after_write:
+            raise ConnectionError("Fake network failure")
+        self.writes.append(write)
+        apply()
+        if fail:
+            raise ConnectionError("Fake network failure")
+
+    def video_ids(self, playlistId) -> list[str]:
+        return [t['videoId'] for t in self.playlists.get(playlistId, [])]
+
+    def get_home(self, limit=3):
+        self.num_home_calls += 1
+        return self.home
+
+    def get_library_playlists(self, limit=None):
+        return [
+            {
+                'playlistId': playlistId,
+                'title': playlistId,
+                'count': f'{len(tracks):,}',
+                'thumbnails': [],
+            }
+            for playlistId, tracks in self.playlists.items()
+        ][:limit]
+
+    def get_playlist(self, playlistId, limit=100, **kwargs):
+        tracks = self.playlists.setdefault(playlistId, [])
+        return {
+            'id': playlistId,
+            'title': playlistId,
+            'description': '',
+            'thumbnails': [],
+            'trackCount': len(tracks),
+            'tracks': [dict(t) for t in tracks[:limit]],
+        }
+
+    def add_playlist_items(self, playlistId, videoIds, duplicates=False):
+        def apply():
+            self.playlists.setdefault(playlistId, []).extend(
+                self._item(v) for v in videoIds
+            )
+        self._write(('add', playlistId, list(videoIds)), apply)
+        return {'status': 'STATUS_SUCCEEDED'}
+
+    def remove_playlist_items(self, playlistId, videos):
+        setVideoIds = {v['setVideoId'] for v in videos}
+        def apply():
+            self.playlists[playlistId] = [
+                t for t in self.playlists.get(playlistId, [])
+                if t['setVideoId'] not in setVideoIds
+            ]
+        self._write(('remove', playlistId, sorted(setVideoIds)), apply)
+        return 'STATUS_SUCCEEDED'
+
+class FakeClients:
+    def __init__(self, client: FakeClient) -> None:
+        self.client = client
+
+    def __enter__(self) -> FakeClient:
+        self.get_client = auth.get_client
+        auth.get_client = lambda name: self.client
+        return self.client
+
+    def __exit__(self, *exc):
+        auth.get_client = self.get_client
+
+def use_temporary_data_path(test) -> Path:
+    tmp = TemporaryDirectory()
+    p_data = Path(tmp.name)
+    get_data_path = ytmb.utils.get_data_path
+    ytmb.utils.get_data_path = lambda: p_data
+    test.addCleanup(tmp.cleanup)
+    test.addCleanup(setattr, ytmb.utils, 'get_data_path', get_data_path)
+    return p_data
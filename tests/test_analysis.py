@@ -0,0 +1,107 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from pathlib import Path
+
+from ytmb.analysis import *
+
+
+AUDITS = {
+    '24-03-01.txt': 'A\nB\nC\n',
+    '24-03-08.txt': 'B\nC\nD\n',
+    '24-03-15.txt': 'C\nD\n',
+}
+
+class TestAuditAnalysis(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.p_audits = Path(self.tmp.name)
+        for user, playlist in [('a', 'Favorites'), ('b', 'Gym')]:
+            p_playlist = self.p_audits / user / playlist
+            p_playlist.mkdir(parents=True)
+            for audit_name, content in AUDITS.items():
+                (p_playlist / audit_name).write_text(content, encoding='utf-8')
+        (self.p_audits / 'a' / 'fingerprints.json').write_text('{}')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_playlist(self):
+        report = analyze_playlist_audits(str(self.p_audits / 'a' / 'Favorites'))
+        self.assertEqual(report['snapshots'], 3)
+        self.assertEqual(report['first_audit'], '24-03-01')
+        self.assertEqual(report['current_size'], 2)
+        self.assertEqual(report['distinct_tracks'], 4)
+        self.assertEqual(report['total_added'], 1)
+        self.assertEqual(report['total_removed'], 2)
+        self.assertAlmostEqual(report['mean_tenure'], 2.0)
+
+    def test_merge(self):
+        report = analyze_audits(max_workers=2, p_audits=self.p_audits)
+        self.assertEqual(
+            [(p['user'], p['playlist']) for p in report['playlists']],
+            [('a', 'Favorites'), ('b', 'Gym')],
+        )
+        self.assertEqual(report['total_removed'], 4)
+
+    def test_names(self):
+        report = analyze_audits(['b'], max_workers=1, p_audits=self.p_audits)
+        self.assertEqual(len(report['playlists']), 1)
+
+class TestMinHash(TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest("NumPy not installed")
+        self.permutations = get_permutations()
+
+    def test_identical(self):
+        a = minhash(['x', 'y', 'z'], self.permutations)
+        b = minhash(['z', 'y', 'x', 'x'], self.permutations)
+        self.assertTrue((a == b).all())
+
+    def test_estimate(self):
+        a = [f'v{i}' for i in range(300)]
+        b = [f'v{i}' for i in range(100, 400)]
+        signatures = np.stack([
+            minhash(a, self.permutations),
+            minhash(b, self.permutations),
+        ])
+        similarity = jaccard_matrix(signatures)
+        self.assertAlmostEqual(float(similarity[0, 0]), 1.0)
+        self.assertAlmostEqual(float(similarity[0, 1]), 0.5, delta=0.15)
+
+    def test_pairs(self):
+        labels = [SketchLabel('a', str(i), str(i)) for i in range(3)]
+        signatures = np.stack([
+            minhash(['x', 'y'], self.permutations),
+            minhash(['p', 'q'], self.permutations),
+            minhash(['x', 'y'], self.permutations),
+        ])
+        pairs = similar_pairs(labels, signatures, threshold=0.9)
+        self.assertEqual(
+            [(a.playlistId, b.playlistId) for _, a, b in pairs],
+            [('0', '2')],
+        )
+
+class TestTasteMatch(TestCase):
+    def setUp(self):
+        if np is None or sp is None:
+            self.skipTest("NumPy and SciPy not installed")
+
+    def test_matrix(self):
+        matrix = build_taste_matrix([
+            {'track:a': 1.0, 'artist:x': 3.0},
+            {'track:a': 1.0, 'artist:x': 3.0},
+            {'track:b': 1.0, 'artist:y': 1.0},
+            {},
+        ])
+        scores = (matrix @ matrix.T).toarray()
+        self.assertAlmostEqual(float(scores[0, 1]), 1.0, places=5)
+        self.assertAlmostEqual(float(scores[0, 2]), 0.0)
+        self.assertAlmostEqual(float(scores[3, 3]), 0.0)
+
+    def test_apportion(self):
+        self.assertEqual(ex.apportion(10, ['a', 'b', 'c']), [4, 3, 3])
+        counts = ex.apportion(10, ['a', 'b'], {'a': 3.0, 'b': 1.0})
+        self.assertEqual(counts, [8, 2])
+        self.assertEqual(ex.apportion(5, ['a', 'b'], {'a': 1.0}), [5, 0])
+        self.assertEqual(ex.apportion(5, ['a', 'b'], {'a': 0.0}), [3, 2])
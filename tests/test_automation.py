@@ -0,0 +1,139 @@
+from unittest import TestCase
+from collections import Counter
+from threading import Lock
+import time
+
+import ytmb.playlists
+import ytmb.automation
+from ytmb.automation import *
+
+
+def routine(sources, target, depends_on=None) -> Routine:
+    r: Routine = {
+        'prog': 'Automated Compilation',
+        'desc': '',
+        'args': {'source_playlists': sources, 'target_playlist': target},
+    }
+    if depends_on:
+        r['depends_on'] = depends_on
+    return r
+
+class TestDependencies(TestCase):
+    def test_inferred(self):
+        dependencies = get_dependencies({
+            'mix': routine(['C', 'D'], 'E'),
+            'compile': routine(['A', 'B'], 'C'),
+            'track': {
+                'prog': 'Automated Tracking',
+                'desc': '',
+                'args': {'name': 'a', 'playlist': 'E'},
+            },
+            'other': routine(['X'], 'Y', ['compile']),
+        })
+        self.assertEqual(dependencies['mix'], {'compile'})
+        self.assertEqual(dependencies['compile'], set())
+        self.assertEqual(dependencies['track'], {'mix'})
+        self.assertEqual(dependencies['other'], {'compile'})
+
+    def test_same_target(self):
+        dependencies = get_dependencies({
+            'first': routine(['A'], 'T'),
+            'second': routine(['B'], 'T'),
+        })
+        self.assertEqual(dependencies['second'], {'first'})
+        self.assertEqual(dependencies['first'], set())
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            get_dependencies({'a': routine(['A'], 'B', ['missing'])})
+
+    def test_order(self):
+        order = order_routines({
+            'c': {'a', 'b'},
+            'b': {'a'},
+            'a': set(),
+            'd': set(),
+        })
+        self.assertLess(order.index('a'), order.index('b'))
+        self.assertLess(order.index('b'), order.index('c'))
+        self.assertEqual(len(order), 4)
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError):
+            order_routines({'a': {'b'}, 'b': {'a'}, 'c': set()})
+
+class TestRunChain(TestCase):
+    def setUp(self):
+        self.get_routines = ytmb.automation.get_routines
+        self.active = Counter()
+        self.max_active = Counter()
+        self.lock = Lock()
+        AUTOMATABLES['Test Program'] = Automatable(dict, self.program)
+
+    def tearDown(self):
+        ytmb.automation.get_routines = self.get_routines
+        del AUTOMATABLES['Test Program']
+
+    def program(self, args):
+        with self.lock:
+            self.active[args['name']] += 1
+            self.active['all'] += 1
+            for key, count in self.active.items():
+                self.max_active[key] = max(self.max_active[key], count)
+        time.sleep(0.02)
+        with self.lock:
+            self.active[args['name']] -= 1
+            self.active['all'] -= 1
+        if args.get('fail'):
+            raise RuntimeError("Fake routine failure")
+
+    def run_routines(self, routines) -> set[str]:
+        ytmb.automation.get_routines = lambda: {
+            n: {'prog': 'Test Program', 'desc': '', **r}
+            for n, r in routines.items()
+        }
+        return run_chain(max_workers=4)
+
+    def test_same_user(self):
+        failed = self.run_routines({
+            'a1': {'args': {'name': 'a'}},
+            'a2': {'args': {'name': 'a'}},
+            'b1': {'args': {'name': 'b'}},
+        })
+        self.assertEqual(failed, set())
+        self.assertEqual(self.max_active['a'], 2)
+        self.assertEqual(self.max_active['all'], 3)
+
+    def test_shared_home(self):
+        failed = self.run_routines({
+            'a1': {'args': {'name': 'a', 'source_users': ['a', 'b']}},
+            'a2': {'args': {'name': 'a', 'source_users': ['b', 'c']}},
+            'c1': {'args': {'name': 'c', 'source_users': ['c']}},
+            'd1': {'args': {'name': 'd', 'source_users': ['d']}},
+        })
+        self.assertEqual(failed, set())
+        self.assertEqual(self.max_active['a'], 1)
+        self.assertEqual(self.max_active['all'], 3)
+
+    def test_failed_dependency(self):
+        failed = self.run_routines({
+            'broken': {'args': {'name': 'a', 'fail': True}},
+            'after': {'args': {'name': 'b'}, 'depends_on': ['broken']},
+            'other': {'args': {'name': 'c'}},
+        })
+        self.assertEqual(failed, {'broken', 'after'})
+
+    def test_resources(self):
+        self.assertEqual(
+            get_routine_resources({
+                'prog': 'Automated Multi-Blend',
+                'desc': '',
+                'args': {
+                    'name': 'a',
+                    'blends': [
+                        {'source_users': ['b', 'c'], 'target_playlist': 'PL'},
+                    ],
+                },
+            }),
+            {'PL', 'home:b', 'home:c'},
+        )
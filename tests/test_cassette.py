@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from ytmb.cassette import *
+
+
+class TestKey(TestCase):
+    def test_kwarg_order(self):
+        self.assertEqual(
+            make_key('a', 'get_playlist', ('PL1',), {'limit': 0, 'b': 1}),
+            make_key('a', 'get_playlist', ('PL1',), {'b': 1, 'limit': 0}),
+        )
+
+    def test_users_differ(self):
+        self.assertNotEqual(
+            make_key('a', 'get_home', (), {}),
+            make_key('b', 'get_home', (), {}),
+        )
+
+class TestPlayback(TestCase):
+    def setUp(self):
+        self.cassette = Cassette('test')
+        self.key = make_key('a', 'get_home', (), {})
+
+    def test_in_order(self):
+        self.cassette.record(self.key, response=1)
+        self.cassette.record(self.key, response=2)
+        self.assertEqual(self.cassette.play(self.key), 1)
+        self.assertEqual(self.cassette.play(self.key), 2)
+
+    def test_repeat_last(self):
+        self.cassette.record(self.key, response=1)
+        self.cassette.play(self.key)
+        self.assertEqual(self.cassette.play(self.key), 1)
+
+    def test_missing(self):
+        with self.assertRaises(KeyError):
+            self.cassette.play(self.key)
+
+    def test_error(self):
+        self.cassette.record(self.key, error='ConnectionError()')
+        with self.assertRaises(RuntimeError):
+            self.cassette.play(self.key)
+
+    def test_replay_client(self):
+        self.cassette.record(self.key, response=[{'title': 'Mixed for you'}])
+        client = ReplayingClient('a', self.cassette)
+        self.assertEqual(client.get_home(), [{'title': 'Mixed for you'}])
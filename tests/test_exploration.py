@@ -0,0 +1,175 @@
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+import time
+import os
+from itertools import count
+
+import ytmb.playlists
+import ytmb.exploration
+from ytmb.utils import global_settings, get_config
+from ytmb.exploration import *
+from fakes import FakeClient, FakeClients, use_temporary_data_path
+
+
+class TestListingMemo(TestCase):
+    def test_shared(self):
+        memo = ListingMemo(ttl=60)
+        fetches = []
+        def fetch():
+            fetches.append(1)
+            time.sleep(0.01)
+            return [{'videoId': 'a'}]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda _: memo.resolve('PL', fetch),
+                range(8),
+            ))
+        self.assertEqual(len(fetches), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_failed_fetch(self):
+        memo = ListingMemo(ttl=60)
+        self.assertEqual(memo.resolve('PL', lambda: []), [])
+        self.assertEqual(memo.resolve('PL', lambda: [1]), [1])
+
+    def test_expired(self):
+        memo = ListingMemo(ttl=1e-9)
+        memo.resolve('PL', lambda: [1])
+        self.assertEqual(memo.resolve('PL', lambda: [2]), [2])
+
+    def test_clear(self):
+        memo = ListingMemo(ttl=60)
+        memo.resolve('PL', lambda: [1])
+        memo.clear()
+        self.assertEqual(memo._ListingMemo__locks, {})
+        self.assertEqual(memo.resolve('PL', lambda: [2]), [2])
+
+def fake_samples(name, k, pool=None, rng=None, exclude=None):
+    videoIds = (f'{name}{i}' for i in count())
+    if exclude is not None:
+        videoIds = (v for v in videoIds if v not in exclude)
+    for i, videoId in zip(range(k), videoIds):
+        if name == 'broken' and i == 80:
+            raise ConnectionError("Fake home failure")
+        yield {'videoId': videoId, 'title': videoId, 'artists': []}
+
+class TestStreamBlend(TestCase):
+    def setUp(self):
+        self.iter_home_samples = ytmb.exploration.iter_home_samples
+        ytmb.exploration.iter_home_samples = fake_samples
+        self.target = {'playlistId': 'PLblend', 'title': 'Blend'}
+
+    def tearDown(self):
+        ytmb.exploration.iter_home_samples = self.iter_home_samples
+
+    def test_stream(self):
+        with FakeClients(FakeClient({'PLblend': ['old1', 'old2']})) as client:
+            stream_blend('a', ['a', 'b'], self.target, 200)
+        videoIds = client.video_ids('PLblend')
+        self.assertEqual(videoIds[:4], ['a0', 'b0', 'a1', 'b1'])
+        self.assertEqual(len(videoIds), 200)
+        self.assertEqual(
+            [w[0] for w in client.writes],
+            ['add'] * 4 + ['remove'],
+        )
+
+    def test_failed_sampler(self):
+        with FakeClients(FakeClient({'PLblend': ['old1', 'old2']})) as client:
+            with self.assertRaises(ConnectionError):
+                stream_blend('a', ['a', 'broken'], self.target, 200)
+        self.assertEqual(client.writes[0][0], 'add')
+        self.assertEqual(client.video_ids('PLblend'), ['old1', 'old2'])
+
+    def test_failed_write(self):
+        with FakeClients(FakeClient({'PLblend': ['old1', 'old2']})) as client:
+            client.fail_at = 1
+            with self.assertRaises(ConnectionError):
+                stream_blend('a', ['a', 'b'], self.target, 200)
+        self.assertEqual(client.video_ids('PLblend'), ['old1', 'old2'])
+
+class TestRotateBlend(TestCase):
+    def setUp(self):
+        self.iter_home_samples = ytmb.exploration.iter_home_samples
+        ytmb.exploration.iter_home_samples = fake_samples
+        use_temporary_data_path(self)
+        self.target = {'playlistId': 'PLtestrotation', 'title': 'Rotation'}
+
+    def tearDown(self):
+        ytmb.exploration.iter_home_samples = self.iter_home_samples
+
+    def test_rotate(self):
+        old = ['o1', 'o2', 'o3', 'o4']
+        with FakeClients(FakeClient({'PLtestrotation': old})) as client:
+            rotate_blend('a', ['a'], self.target, 4, 0.5)
+            self.assertEqual(
+                client.video_ids('PLtestrotation'),
+                ['o3', 'o4', 'a0', 'a1'],
+            )
+            rotate_blend('a', ['a'], self.target, 4, 0.5)
+            self.assertEqual(
+                client.video_ids('PLtestrotation'),
+                ['a0', 'a1', 'a2', 'a3'],
+            )
+
+    def test_multiple(self):
+        old = ['o1', 'o2', 'o3', 'o4']
+        with FakeClients(FakeClient({'PLtestrotation': old})) as client:
+            create_blends('a', [(['a'], self.target)], 4, rotation=0.5)
+            self.assertEqual(
+                client.video_ids('PLtestrotation'),
+                ['o3', 'o4', 'a0', 'a1'],
+            )
+
+    def test_resumed(self):
+        old = ['o1', 'o2', 'o3', 'o4']
+        with FakeClients(FakeClient({'PLtestrotation': old})) as client:
+            client.fail_at = 1
+            with self.assertRaises(ConnectionError):
+                rotate_blend('a', ['a'], self.target, 4, 0.5)
+            ytmb.playlists.resume_pending_write('a', self.target)
+            self.assertEqual(
+                client.video_ids('PLtestrotation'),
+                ['o3', 'o4', 'a0', 'a1'],
+            )
+            rotation = get_rotation(self.target)
+            self.assertGreater(rotation['a0'], rotation['o3'])
+            rotate_blend('a', ['a'], self.target, 4, 0.5)
+            self.assertEqual(
+                client.video_ids('PLtestrotation'),
+                ['a0', 'a1', 'a2', 'a3'],
+            )
+
+class TestHomeCache(TestCase):
+    def setUp(self):
+        use_temporary_data_path(self)
+        self.client = FakeClient()
+        self.client.home = [{'title': 'Quick picks', 'contents': []}]
+        self.p_home = get_home_cache_path() / 'a.json'
+
+    def tearDown(self):
+        global_settings['refresh_home'] = False
+
+    def test_hit(self):
+        with FakeClients(self.client):
+            self.assertEqual(get_home('a'), self.client.home)
+            self.assertEqual(get_home('a'), self.client.home)
+        self.assertEqual(self.client.num_home_calls, 1)
+
+    def test_expired(self):
+        with FakeClients(self.client):
+            get_home('a')
+            old = time.time() - get_config()['blend']['home_cache']['ttl']
+            os.utime(self.p_home, (old, old))
+            get_home('a')
+        self.assertEqual(self.client.num_home_calls, 2)
+
+    def test_refresh(self):
+        with FakeClients(self.client):
+            get_home('a')
+            get_home('a', force_refresh=True)
+            global_settings['refresh_home'] = True
+            self.client.home = [{'title': 'Fresh', 'contents': []}]
+            get_home('a')
+            global_settings['refresh_home'] = False
+            self.assertEqual(get_home('a'), self.client.home)
+        self.assertEqual(self.client.num_home_calls, 3)
@@ -0,0 +1,72 @@
+from unittest import TestCase
+
+from ytmb.filtering import *
+
+
+SONG = {'videoId': 'v', 'title': 'Song'}
+ALBUM = {'type': 'Album', 'browseId': 'b', 'title': 'Album'}
+RADIO = {'playlistId': 'RD', 'title': 'Radio'}
+HOME = [
+    {'title': 'Quick picks', 'contents': [SONG, RADIO]},
+    {'title': 'Mixed for you: Pop', 'contents': [RADIO]},
+    {'title': 'Albums for you', 'contents': [ALBUM]},
+]
+
+def titles(labeled_listings):
+    return [(l['title'], hs['title']) for l, hs in labeled_listings]
+
+class TestRules(TestCase):
+    def test_exact(self):
+        rules = compile_rules(['Quick picks', ''])
+        self.assertTrue(rules.matches_section('Quick picks'))
+        self.assertFalse(rules.matches_section('Quick picks 2'))
+
+    def test_glob(self):
+        rules = compile_rules(['glob:Mixed for *'])
+        self.assertTrue(rules.matches_section('Mixed for you: Pop'))
+        self.assertFalse(rules.matches_section('Not mixed for you'))
+
+    def test_regex(self):
+        rules = compile_rules([r're:(?i)albums? for .*'])
+        self.assertTrue(rules.matches_section('Albums for you'))
+
+    def test_bad_rules(self):
+        with self.assertLogs(level='WARNING'):
+            rules = compile_rules(['type:podcasts', 're:(', 'Quick picks'])
+        self.assertEqual(rules.titles, {'Quick picks'})
+        self.assertEqual(rules.patterns, ())
+        self.assertEqual(rules.listing_types, set())
+
+class TestFilterHome(TestCase):
+    def test_no_rules(self):
+        self.assertEqual(len(filter_home(HOME)), 4)
+
+    def test_whitelist(self):
+        rules = compile_rules(['glob:*picks', 'type:songs'])
+        self.assertEqual(
+            titles(filter_home(HOME, whitelist=rules)),
+            [('Song', 'Quick picks')],
+        )
+
+    def test_whitelist_types_only(self):
+        rules = compile_rules(['type:radios'])
+        self.assertEqual(
+            titles(filter_home(HOME, whitelist=rules)),
+            [('Radio', 'Quick picks'), ('Radio', 'Mixed for you: Pop')],
+        )
+
+    def test_blacklist(self):
+        rules = compile_rules(['Albums for you', 'type:radios'])
+        self.assertEqual(
+            titles(filter_home(HOME, blacklist=rules)),
+            [('Song', 'Quick picks')],
+        )
+
+    def test_empty_whitelist(self):
+        whitelist = compile_rules(['# nothing yet', ''])
+        blacklist = compile_rules(['type:radios'])
+        self.assertFalse(whitelist)
+        self.assertEqual(
+            titles(filter_home(HOME, whitelist, blacklist)),
+            [('Song', 'Quick picks'), ('Album', 'Albums for you')],
+        )
@@ -0,0 +1,56 @@
+from unittest import TestCase
+from datetime import date
+
+from ytmb.history import *
+
+
+PLAYLIST = {'playlistId': 'PL1', 'title': 'Favorites'}
+
+def track(video_id):
+    return {'videoId': video_id, 'title': f'Song {video_id}'}
+
+class TestHistory(TestCase):
+    def setUp(self):
+        self.con = connect(':memory:')
+        record_snapshot(
+            self.con, 'a', PLAYLIST, [track('x'), track('y')], date(2024, 3, 1)
+        )
+        record_snapshot(
+            self.con, 'a', PLAYLIST, [track('y'), track('z')], date(2024, 3, 8)
+        )
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_intervals(self):
+        x, = get_track_intervals(self.con, 'x')
+        self.assertEqual((x.start_date, x.end_date), ('2024-03-01', '2024-03-08'))
+        y, = get_track_intervals(self.con, 'y')
+        self.assertIsNone(y.end_date)
+
+    def test_point_in_time(self):
+        self.assertEqual(
+            len(get_playlists_with(self.con, 'x', date(2024, 3, 5))), 1
+        )
+        self.assertEqual(
+            get_playlists_with(self.con, 'x', date(2024, 3, 8)), []
+        )
+
+    def test_playlist_at(self):
+        members = get_playlist_at(self.con, 'PL1', date(2024, 3, 8))
+        self.assertEqual({m.video_id for m in members}, {'y', 'z'})
+
+    def test_readded(self):
+        record_snapshot(
+            self.con, 'a', PLAYLIST, [track('x')], date(2024, 3, 15)
+        )
+        self.assertEqual(len(get_track_intervals(self.con, 'x')), 2)
+
+    def test_find_titles(self):
+        self.assertEqual(len(find_titles(self.con, 'Song z')), 1)
+
+    def test_snapshot_dates(self):
+        self.assertEqual(
+            get_snapshot_dates(self.con, 'PL1'),
+            ['2024-03-01', '2024-03-08'],
+        )
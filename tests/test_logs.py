@@ -0,0 +1,56 @@
+from unittest import TestCase
+import logging
+import json
+
+from ytmb.logs import *
+
+
+class TestLazy(TestCase):
+    def test_deferred(self):
+        calls = []
+        lazy = Lazy(lambda: calls.append(1) or 'text')
+        self.assertEqual(calls, [])
+        self.assertEqual(str(lazy), 'text')
+        self.assertEqual(calls, [1])
+
+class TestTruncated(TestCase):
+    def test_short(self):
+        self.assertEqual(str(Truncated(['a', 'b'], limit=3)), "'a', 'b'")
+
+    def test_long(self):
+        self.assertEqual(
+            str(Truncated(list(range(10)), limit=3)),
+            "0, 1, 2, ... (7 more)",
+        )
+
+    def test_key(self):
+        tracks = [{'title': 'x'}, {'title': 'y'}]
+        self.assertEqual(
+            str(Truncated(tracks, sep='\n', key=lambda t: t['title'])),
+            "x\ny",
+        )
+
+    def test_lazy_limit(self):
+        import ytmb.logs
+        reads = []
+        get_config = ytmb.logs.get_config
+        ytmb.logs.get_config = lambda: reads.append(1) or get_config()
+        get_truncate_items.cache_clear()
+        try:
+            truncated = Truncated(list(range(100)))
+            self.assertEqual(reads, [])
+            str(truncated)
+            str(Truncated(list(range(100))))
+            self.assertEqual(reads, [1])
+        finally:
+            ytmb.logs.get_config = get_config
+
+class TestJsonLines(TestCase):
+    def test_fields(self):
+        record = logging.LogRecord(
+            'root', logging.DEBUG, __file__, 1, "Adding tracks", None, None,
+        )
+        record.fields = {'videoIds': ['a', 'b']}
+        entry = json.loads(JsonLinesFormatter().format(record))
+        self.assertEqual(entry['message'], "Adding tracks")
+        self.assertEqual(entry['videoIds'], ['a', 'b'])
@@ -0,0 +1,272 @@
+from unittest import TestCase
+from collections import Counter
+
+import ytmb.playlists
+import ytmb.journal as jr
+from ytmb.playlists import *
+from fakes import FakeClient, FakeClients, use_temporary_data_path
+
+
+def make_tracks(lengths):
+    return [
+        [{'videoId': f'{i}-{j}', 'title': f'{i}-{j}'} for j in range(n)]
+        for i, n in enumerate(lengths)
+    ]
+
+class TestCombineArrays(TestCase):
+    def setUp(self):
+        if np is None:
+            self.skipTest("NumPy not installed")
+        self.tracks = make_tracks([5, 0, 3, 7])
+
+    def test_matches_lists(self):
+        for limit in [None, 2, 4]:
+            for method in [
+                CombinationMethod.INTERLEAVED,
+                CombinationMethod.CONCATENATED,
+            ]:
+                self.assertEqual(
+                    combine_arrays(
+                        self.tracks,
+                        limit,
+                        SampleMethod.IN_ORDER,
+                        method,
+                        np.random.default_rng(0),
+                    ),
+                    combine_lists(
+                        self.tracks,
+                        limit,
+                        SampleMethod.IN_ORDER,
+                        method,
+                    ),
+                )
+
+    def test_random(self):
+        combined = combine_tracks(
+            self.tracks,
+            4,
+            SampleMethod.RANDOM,
+            CombinationMethod.SHUFFLED,
+            rng=np.random.default_rng(0),
+        )
+        self.assertEqual(
+            Counter(t['videoId'][0] for t in combined),
+            {'0': 4, '2': 3, '3': 4},
+        )
+        self.assertEqual(len({t['videoId'] for t in combined}), 11)
+        self.assertEqual(
+            combined,
+            combine_tracks(
+                self.tracks,
+                4,
+                SampleMethod.RANDOM,
+                CombinationMethod.SHUFFLED,
+                rng=np.random.default_rng(0),
+            ),
+        )
+
+class TestCombineLists(TestCase):
+    def test_random_zero(self):
+        tracks = make_tracks([5, 3])
+        for method in [SampleMethod.RANDOM, SampleMethod.IN_ORDER]:
+            self.assertEqual(
+                combine_lists(tracks, 0, method, CombinationMethod.SHUFFLED),
+                [],
+            )
+
+    def test_random_all(self):
+        tracks = make_tracks([5, 3])
+        combined = combine_lists(
+            tracks,
+            None,
+            SampleMethod.RANDOM,
+            CombinationMethod.CONCATENATED,
+        )
+        self.assertEqual(len(combined), 8)
+
+class TestDedupe(TestCase):
+    def setUp(self):
+        def track(title, videoId):
+            return {
+                'videoId': videoId,
+                'title': title,
+                'artists': [{'name': 'Adele'}],
+            }
+        self.tracks = [
+            [
+                track("Hello", 'a'),
+                track("Hello (Audio)", 'b'),
+                track("Skyfall", 'c'),
+            ],
+            [
+                track("Hello [Lyrics]", 'd'),
+                track("Easy on Me", 'e'),
+                track("Someone Like You", 'f'),
+            ],
+        ]
+
+    def video_ids(self, tracks) -> list[str]:
+        return [t['videoId'] for t in tracks]
+
+    def test_sample_size(self):
+        for sample_size in [2, SampleLimit.SHORTEST_PLAYLIST]:
+            combined = combine_tracks(
+                self.tracks,
+                sample_size,
+                SampleMethod.IN_ORDER,
+                CombinationMethod.CONCATENATED,
+                dedupe=True,
+            )
+            self.assertEqual(self.video_ids(combined), ['a', 'c', 'e', 'f'])
+
+    def test_difference(self):
+        minuend, subtrahend = self.tracks
+        self.assertEqual(
+            self.video_ids(tracks_difference(minuend, subtrahend, True)),
+            ['c'],
+        )
+        self.assertEqual(
+            self.video_ids(tracks_difference(minuend, subtrahend)),
+            ['a', 'b', 'c'],
+        )
+
+def write_kinds(client) -> list[str]:
+    return [w[0] for w in client.writes]
+
+class TestJournal(TestCase):
+    def setUp(self):
+        use_temporary_data_path(self)
+        self.target = {'playlistId': 'PLtestjournal', 'title': 'Journal'}
+        self.new = [{'videoId': f'n{i}'} for i in range(60)]
+
+    def crash_and_resume(self, fail_at, fail_after_write):
+        client = FakeClient({'PLtestjournal': ['o1', 'o2']})
+        with FakeClients(client):
+            client.fail_at = fail_at
+            client.fail_after_write = fail_after_write
+            with self.assertRaises(ConnectionError):
+                overwrite_playlist('a', self.target, self.new)
+            self.assertIsNotNone(jr.get_journal(self.target))
+            self.assertTrue(resume_pending_write('a', self.target))
+        self.assertIsNone(jr.get_journal(self.target))
+        self.assertEqual(
+            client.video_ids('PLtestjournal'),
+            [t['videoId'] for t in self.new],
+        )
+        return client
+
+    def test_uninterrupted(self):
+        client = FakeClient({'PLtestjournal': ['o1', 'o2']})
+        with FakeClients(client):
+            overwrite_playlist('a', self.target, self.new)
+        self.assertEqual(write_kinds(client), ['add', 'add', 'remove'])
+        self.assertIsNone(jr.get_journal(self.target))
+
+    def test_failed_add(self):
+        client = self.crash_and_resume(1, False)
+        self.assertEqual(write_kinds(client), ['add', 'add', 'remove'])
+
+    def test_lost_add_checkpoint(self):
+        client = self.crash_and_resume(1, True)
+        self.assertEqual(write_kinds(client), ['add', 'add', 'remove'])
+
+    def test_lost_remove_checkpoint(self):
+        client = self.crash_and_resume(2, True)
+        self.assertEqual(write_kinds(client), ['add', 'add', 'remove'])
+
+    def test_failed_add_of_same_tracks(self):
+        videoIds = [f'o{i}' for i in range(30)]
+        client = FakeClient({'PLtestjournal': videoIds})
+        with FakeClients(client):
+            client.fail_at = 0
+            with self.assertRaises(ConnectionError):
+                overwrite_playlist(
+                    'a',
+                    self.target,
+                    [{'videoId': v} for v in videoIds],
+                )
+            self.assertTrue(resume_pending_write('a', self.target))
+        self.assertEqual(client.video_ids('PLtestjournal'), videoIds)
+
+    def test_nothing_pending(self):
+        with FakeClients(FakeClient()):
+            self.assertFalse(resume_pending_write('a', self.target))
+
+def shelf_page(i, num_pages) -> list[dict]:
+    contents = [{'videoId': f'{i}-{j}', 'title': f'{i}-{j}'} for j in range(3)]
+    if i + 1 < num_pages:
+        contents.append({'continuationItemRenderer': {'continuationEndpoint': {
+            'continuationCommand': {'token': str(i + 1)},
+        }}})
+    return contents
+
+class BrowsingClient(YTMusic if parse_playlist_items else object):
+    def __init__(self, num_pages) -> None:
+        super().__init__()
+        self.num_pages = num_pages
+        self.requests = []
+
+    def _send_request(self, endpoint, body, additionalParams=''):
+        self.requests.append(body)
+        if 'continuation' in body:
+            contents = shelf_page(int(body['continuation']), self.num_pages)
+            return {'onResponseReceivedActions': [
+                {'appendContinuationItemsAction': {
+                    'continuationItems': contents,
+                }},
+            ]}
+        shelf = {'contents': shelf_page(0, self.num_pages)}
+        return {'contents': {'twoColumnBrowseResultsRenderer': {
+            'secondaryContents': {'sectionListRenderer': {
+                'contents': [{'musicPlaylistShelfRenderer': shelf}],
+            }},
+        }}}
+
+class TestIterTracks(TestCase):
+    def setUp(self):
+        if parse_playlist_items is None:
+            self.skipTest("ytmusicapi internals not available")
+        self.parse_playlist_items = ytmb.playlists.parse_playlist_items
+        ytmb.playlists.parse_playlist_items = lambda contents: [
+            c for c in contents if 'videoId' in c
+        ]
+        self.playlist = {'playlistId': 'PL1', 'title': 'Streamed'}
+
+    def tearDown(self):
+        ytmb.playlists.parse_playlist_items = self.parse_playlist_items
+
+    def test_pages_fetched_once(self):
+        client = BrowsingClient(4)
+        with FakeClients(client):
+            pages = list(iter_track_pages('a', self.playlist))
+        self.assertEqual([len(p) for p in pages], [3, 3, 3, 3])
+        self.assertEqual(len(client.requests), 4)
+        self.assertEqual(client.requests[0], {'browseId': 'VLPL1'})
+
+    def test_early_stop(self):
+        client = BrowsingClient(4)
+        with FakeClients(client):
+            combined = combine_tracks(
+                [iter_tracks('a', self.playlist)],
+                4,
+                SampleMethod.IN_ORDER,
+            )
+        self.assertEqual(len(combined), 4)
+        self.assertEqual(len(client.requests), 2)
+
+    def test_fallback(self):
+        with FakeClients(FakeClient({'PL1': ['a', 'b']})):
+            pages = list(iter_track_pages('a', self.playlist))
+        self.assertEqual(
+            [[t['videoId'] for t in p] for p in pages],
+            [['a', 'b']],
+        )
+
+class TestTrackCount(TestCase):
+    def test_string_count(self):
+        with FakeClients(FakeClient()):
+            self.assertTrue(is_empty('a', {'playlistId': 'PL1', 'count': '0'}))
+            self.assertEqual(
+                get_track_count('a', {'playlistId': 'PL1', 'count': '1,234'}),
+                1234,
+            )
@@ -0,0 +1,52 @@
+from unittest import TestCase
+import time
+
+from ytmb.utils import get_config
+from ytmb.recency import *
+from fakes import use_temporary_data_path
+
+
+class TestRecentTracks(TestCase):
+    def setUp(self):
+        use_temporary_data_path(self)
+
+    def test_decay(self):
+        now = time.time()
+        recent = RecentTracks(
+            'a',
+            tracks={'old': now - 10**9, 'new': now},
+            listings={'gone': now - 10**9, 'kept': now},
+        )
+        self.assertTrue(recent.is_recent('new'))
+        self.assertFalse(recent.is_recent('old'))
+        self.assertTrue(recent.is_exhausted('kept'))
+        self.assertFalse(recent.is_exhausted('gone'))
+
+    def test_bounded(self):
+        now = time.time()
+        tracks = {str(i): now - i for i in range(recent_limit() + 10)}
+        recent = RecentTracks('a', tracks=tracks)
+        self.assertEqual(len(recent.tracks), recent_limit())
+        self.assertTrue(recent.is_recent('0'))
+        self.assertFalse(recent.is_recent(str(recent_limit())))
+
+    def test_exhaust(self):
+        recent = RecentTracks('a')
+        recent.use('x')
+        recent.use('y')
+        recent.exhaust('PL', ['x', 'y'])
+        self.assertEqual(recent.listings['PL'], recent.tracks['x'])
+
+    def test_concurrent_saves(self):
+        first = RecentTracks.load('a')
+        second = RecentTracks.load('a')
+        first.use('x')
+        second.use('y')
+        first.save()
+        second.save()
+        saved = RecentTracks.load('a')
+        self.assertTrue(saved.is_recent('x'))
+        self.assertTrue(saved.is_recent('y'))
+
+def recent_limit():
+    return get_config()['blend']['recency']['max_size']
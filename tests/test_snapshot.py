@@ -0,0 +1,78 @@
+from unittest import TestCase
+from tempfile import TemporaryDirectory
+from pathlib import Path
+
+from ytmb.snapshot import *
+
+
+LIBRARIES = {
+    'a': [
+        (
+            {
+                'playlistId': 'PL1',
+                'title': 'Favorites',
+                'description': '',
+                'thumbnails': [{'url': 'https://thumb'}],
+                'count': '2',
+            },
+            [
+                {
+                    'videoId': 'v1',
+                    'title': 'Café',
+                    'artists': [{'name': 'X'}, {'name': 'Y'}],
+                    'album': {'name': 'Album'},
+                    'setVideoId': 's1',
+                    'duration_seconds': 185,
+                },
+                {'videoId': 'v2', 'title': 'Two', 'artists': []},
+            ],
+        ),
+        ({'playlistId': 'PL2', 'title': 'Empty', 'thumbnails': []}, []),
+    ],
+    'b': [
+        (
+            {'playlistId': 'PL1', 'title': 'Favorites', 'count': '1,234'},
+            [{'videoId': 'v1', 'title': 'Café', 'artists': [{'name': 'X'}]}],
+        ),
+    ],
+}
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.p_snapshot = Path(self.tmp.name) / 'library.ytmbsnap'
+        write_snapshot(self.p_snapshot, LIBRARIES)
+        self.snapshot = Snapshot(self.p_snapshot)
+
+    def tearDown(self):
+        del self.snapshot
+        self.tmp.cleanup()
+
+    def test_playlists(self):
+        self.assertEqual(self.snapshot.names(), ['a', 'b'])
+        playlists = self.snapshot.get_playlists('a')
+        self.assertEqual([p['title'] for p in playlists], ['Favorites', 'Empty'])
+        self.assertEqual(playlists[0]['thumbnails'], [{'url': 'https://thumb'}])
+        self.assertNotIn('count', playlists[1])
+        self.assertEqual(self.snapshot.get_playlists('b')[0]['count'], 1234)
+
+    def test_tracks(self):
+        playlist = self.snapshot.get_playlist('a', 'PL1')
+        self.assertEqual(playlist['trackCount'], 2)
+        first, second = playlist['tracks']
+        self.assertEqual(first['title'], 'Café')
+        self.assertEqual([a['name'] for a in first['artists']], ['X', 'Y'])
+        self.assertEqual(first['album']['name'], 'Album')
+        self.assertEqual(first['duration'], '3:05')
+        self.assertEqual(second['artists'], [])
+        self.assertIsNone(second['setVideoId'])
+        self.assertEqual(len(self.snapshot.get_playlist('b', 'PL1')['tracks']), 1)
+
+    def test_client(self):
+        client = SnapshotClient('a', self.snapshot)
+        self.assertEqual(client.get_playlist('PL1', limit=0)['tracks'], [])
+        self.assertEqual(len(client.get_library_playlists()), 2)
+        with self.assertRaises(RuntimeError):
+            client.add_playlist_items('PL1', ['v3'])
+        with self.assertRaises(KeyError):
+            client.get_playlist('PL3')
@@ -0,0 +1,90 @@
+from unittest import TestCase
+from contextlib import redirect_stdout
+from io import StringIO
+import builtins
+
+import ytmb.playlists
+import ytmb.track_index as ti
+import ytmb.menus.search
+from ytmb.track_index import *
+from fakes import FakeClient, FakeClients, use_temporary_data_path
+
+
+A = Location('a', 'PL1', 'Mine')
+B = Location('b', 'PL2', 'Theirs')
+
+class TestTrackIndex(TestCase):
+    def setUp(self):
+        self.index = TrackIndex()
+        self.index.add_playlist(A, [
+            ['v1', 'Dancing Queen', 'ABBA'],
+            ['v2', 'Waterloo', 'ABBA'],
+        ])
+        self.index.add_playlist(B, [['v1', 'Dancing Queen', 'ABBA']])
+
+    def test_find_video(self):
+        self.assertEqual(
+            [h.location for h in self.index.find_video('v1')],
+            [A, B],
+        )
+        self.assertEqual(self.index.find_video('missing'), [])
+
+    def test_find(self):
+        self.assertEqual(
+            [h.videoId for h in self.index.find('abba')],
+            ['v1', 'v1', 'v2'],
+        )
+        self.assertEqual(
+            [h.location for h in self.index.find('queen ABBA')],
+            [A, B],
+        )
+        self.assertEqual(self.index.find('queen waterloo'), [])
+
+class TestTrackCache(TestCase):
+    def setUp(self):
+        use_temporary_data_path(self)
+
+    def test_incremental(self):
+        client = FakeClient({'PL1': ['v1', 'v2'], 'PL2': ['v3']})
+        with FakeClients(client):
+            self.assertEqual(update_track_cache('a'), 2)
+            self.assertEqual(update_track_cache('a'), 0)
+            client.playlists['PL2'].append(client._item('v4'))
+            del client.playlists['PL1']
+            self.assertEqual(update_track_cache('a'), 1)
+        index = load_track_index(['a'])
+        self.assertEqual(index.find_video('v1'), [])
+        self.assertEqual(
+            [h.location.playlistId for h in index.find_video('v4')],
+            ['PL2'],
+        )
+
+class TestSearchMenu(TestCase):
+    def setUp(self):
+        self.load_track_index = ti.load_track_index
+        self.input = builtins.input
+        index = TrackIndex()
+        index.add_playlist(A, [['v1', 'Dancing Queen', 'ABBA']])
+        ti.load_track_index = lambda: index
+
+    def tearDown(self):
+        ti.load_track_index = self.load_track_index
+        builtins.input = self.input
+
+    def search(self, query) -> str:
+        builtins.input = lambda prompt: query
+        out = StringIO()
+        with redirect_stdout(out):
+            ytmb.menus.search.search_tracks()
+        return out.getvalue()
+
+    def test_found(self):
+        hit = "Dancing Queen - ABBA: a/Mine\n"
+        self.assertEqual(self.search('queen'), hit)
+        self.assertEqual(self.search('v1'), hit)
+
+    def test_not_found(self):
+        self.assertEqual(
+            self.search('waterloo'),
+            "No matching tracks found.\n",
+        )
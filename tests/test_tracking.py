@@ -0,0 +1,30 @@
+from unittest import TestCase
+
+import ytmb.playlists
+from ytmb.menus.tracking import *
+from fakes import FakeClient, FakeClients
+
+
+class TestChangedPlaylists(TestCase):
+    def setUp(self):
+        self.client = FakeClient({'PL1': ['a', 'b'], 'PL2': ['c']})
+        with FakeClients(self.client):
+            jobs = get_changed_playlists(['a'], {'a': {}})
+        self.fingerprints = {'a': {p['playlistId']: f for _, p, f in jobs}}
+
+    def changed(self, force=False) -> list[str]:
+        with FakeClients(self.client):
+            jobs = get_changed_playlists(['a'], self.fingerprints, force)
+        return [p['playlistId'] for _, p, _ in jobs]
+
+    def test_unchanged(self):
+        self.assertEqual(self.changed(), [])
+
+    def test_count_changed(self):
+        self.client.playlists['PL2'].append(self.client._item('d'))
+        self.assertEqual(self.changed(), ['PL2'])
+
+    def test_force(self):
+        self.client.playlists['PL2'] = [self.client._item('d')]
+        self.assertEqual(self.changed(), [])
+        self.assertEqual(self.changed(force=True), ['PL1', 'PL2'])
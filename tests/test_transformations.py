@@ -0,0 +1,80 @@
+from unittest import TestCase
+import random
+
+from ytmb.transformations import *
+
+
+def track(title, artist, videoId='', duration=None):
+    t = {'videoId': videoId, 'title': title, 'artists': [{'name': artist}]}
+    if duration is not None:
+        t['duration_seconds'] = duration
+    return t
+
+class TestTrackKey(TestCase):
+    def test_variants(self):
+        keys = {
+            track_key(track("Hello (Official Music Video)", "Adele")),
+            track_key(track("Adele - Hello", "AdeleVEVO")),
+            track_key(track("Hello [Lyrics]", "Adele - Topic")),
+            track_key(track("Hello (feat. Nobody)", "Adele")),
+        }
+        self.assertEqual(keys, {TrackKey('hello', 'adele')})
+
+    def test_meaningful_qualifiers(self):
+        self.assertNotEqual(
+            track_key(track("Hello (Live at the BBC)", "Adele")),
+            track_key(track("Hello", "Adele")),
+        )
+        self.assertEqual(track_key(track("1999", "Prince")).title, '1999')
+
+    def test_remaster(self):
+        self.assertEqual(
+            track_key(track("Here Comes the Sun - Remastered 2009", "Beatles")),
+            track_key(track("Here Comes the Sun", "Beatles")),
+        )
+
+class TestDedupe(TestCase):
+    def test_groups(self):
+        tracks = [
+            track("Hello", "Adele", 'a', 295),
+            track("Hello (Official Video)", "Adele", 'b', 367),
+            track("Hello (Audio)", "Adele", 'c', 296),
+            track("Hello", "Lionel Richie", 'd'),
+            track("HELLO", "Adele", 'e'),
+        ]
+        groups = group_duplicates(tracks)
+        self.assertEqual(
+            [[t['videoId'] for t in g] for g in groups],
+            [['a', 'c', 'e'], ['b'], ['d']],
+        )
+        self.assertEqual(
+            [t['videoId'] for t in dedupe_tracks(tracks)],
+            ['a', 'b', 'd'],
+        )
+
+    def test_duration_string(self):
+        self.assertEqual(get_duration({'duration': '1:02:03'}), 3723)
+        self.assertIsNone(get_duration({'duration': 'live'}))
+
+class TestSpreadShuffle(TestCase):
+    def test_permutation(self):
+        tracks = [track(f"Song {i}", f"Artist {i % 5}", str(i)) for i in range(50)]
+        tracks.append(track("No Artist", '', 'x'))
+        tracks[-1]['artists'] = []
+        shuffled = spread_shuffle(tracks, random.Random(0))
+        self.assertCountEqual(
+            [t['videoId'] for t in shuffled],
+            [t['videoId'] for t in tracks],
+        )
+
+    def test_spread(self):
+        tracks = (
+            [track(f"A{i}", "Dominant", f'a{i}') for i in range(10)]
+            + [track(f"B{i}", f"Other {i}", f'b{i}') for i in range(30)]
+        )
+        shuffled = spread_shuffle(tracks, random.Random(1))
+        positions = [
+            i for i, t in enumerate(shuffled) if t['videoId'].startswith('a')
+        ]
+        gaps = [b - a for a, b in zip(positions, positions[1:])]
+        self.assertGreaterEqual(min(gaps), 2)
@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from ytmb.ui import *
+
+
+class TestPager(TestCase):
+    def setUp(self):
+        self.pager = Pager({str(i): i for i in range(12)}, page_size=5)
+
+    def test_pages(self):
+        self.assertEqual(list(self.pager.get_current_page()), list('01234'))
+        self.pager.go_next()
+        self.pager.go_next()
+        self.assertTrue(self.pager.at_last_page())
+        self.assertEqual(list(self.pager.get_current_page()), ['10', '11'])
+
+    def test_setitem(self):
+        self.pager['12'] = 12
+        self.assertEqual(len(self.pager), 13)
+
+    def test_filter(self):
+        self.pager.go_next()
+        self.pager.filter(['3', '7'])
+        self.assertTrue(self.pager.at_first_page())
+        self.assertTrue(self.pager.at_last_page())
+        self.assertEqual(self.pager.get_current_page(), {'3': 3, '7': 7})
+        self.pager.filter()
+        self.assertEqual(len(self.pager), 12)
+
+class TestSearchIndex(TestCase):
+    def setUp(self):
+        self.index = SearchIndex({
+            '1': "Road Trip (40 tracks)",
+            '2': "Chill Roadhouse Blues (12 tracks)",
+            '3': "Workout (8 tracks)",
+        })
+
+    def test_prefix(self):
+        self.assertEqual(self.index.search('road'), ['1', '2'])
+
+    def test_all_tokens(self):
+        self.assertEqual(self.index.search('ro bl'), ['2'])
+
+    def test_case(self):
+        self.assertEqual(self.index.search('WORK'), ['3'])
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('jazz'), [])
+
+    def test_empty(self):
+        self.assertEqual(self.index.search(''), ['1', '2', '3'])
@@ -24,3 +24,13 @@ class TestFilename(TestCase):
 
     def test_backslash(self):
         self.assertFalse(is_ok_filename(r'c\windows\perhaps'))
+
+class TestParseCount(TestCase):
+    def test_counts(self):
+        self.assertEqual(parse_count(25), 25)
+        self.assertEqual(parse_count('0'), 0)
+        self.assertEqual(parse_count('1,234'), 1234)
+
+    def test_missing(self):
+        self.assertIsNone(parse_count(None))
+        self.assertIsNone(parse_count('many'))
@@ -5,35 +5,59 @@ from enum import Enum, auto
 from typing import NamedTuple, Optional
 from pathlib import Path
 
-from ytmb.utils import global_settings, get_config_path
-from ytmb.automation import get_routines, AUTOMATABLES
+from ytmb.utils import global_settings, get_config, get_config_path
+from ytmb.logs import JsonLinesFormatter
+from ytmb.cassette import Cassette
+from ytmb.snapshot import Snapshot
+from ytmb.automation import get_routines, run_routine, run_chain, AUTOMATABLES
 from ytmb.ui import Actor, Action
 from ytmb.menus.users import users_menu
-from ytmb.menus.blend import blend_flow
+from ytmb.menus.blend import blend_flow, multi_blend_flow
 from ytmb.menus.mixtape import mixtape_flow
 from ytmb.menus.compilation import compilation_flow
 from ytmb.menus.advanced import advanced_flow
-from ytmb.menus.tracking import tracking_flow
+from ytmb.menus.tracking import tracking_flow, bulk_tracking_flow
 from ytmb.menus.routines import routines_menu
+from ytmb.menus.search import search_menu
+import ytmb.history as history
+import ytmb.analysis as analysis
+import ytmb.library as library
 
 
 DEFAULT_LOG_PATH = Path(__file__).parent / 'debug.log'
 
+COMMANDS = {
+    'history': history.main,
+    'analyze': analysis.main,
+    'export': library.export_main,
+    'import': library.import_main,
+}
+
 class LogOptions(Enum):
     SHOW_LOG = auto()
 
 class ArgNamespace(NamedTuple):
     routine: Optional[str]
+    chain: Optional[list[str]]
     config: bool
     verbose: int
     log: Path | LogOptions
+    log_json: Optional[Path]
     debug: bool
+    force: bool
+    refresh_home: bool
+    record: Optional[str]
+    replay: Optional[str]
+    snapshot: Optional[str]
+    command_args: list[str]
 
 def parse_args() -> ArgNamespace:
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(allow_abbrev=False)
 
     parser.add_argument('routine', nargs='?')
 
+    parser.add_argument('--chain', nargs='*', metavar='ROUTINE')
+
     parser.add_argument('--config', action='store_true')
 
     verbosity = parser.add_mutually_exclusive_group()
@@ -60,9 +84,24 @@ def parse_args() -> ArgNamespace:
         default=DEFAULT_LOG_PATH,
     )
 
+    parser.add_argument('--log-json', type=Path)
+
     parser.add_argument('--debug', action='store_true')
 
-    return parser.parse_args()
+    parser.add_argument('--force', action='store_true')
+
+    parser.add_argument('--refresh-home', action='store_true')
+
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='CASSETTE')
+    cassette.add_argument('--replay', metavar='CASSETTE')
+    cassette.add_argument('--snapshot')
+
+    args, command_args = parser.parse_known_args()
+    if command_args and args.routine not in COMMANDS:
+        parser.error(f"unrecognized arguments: {' '.join(command_args)}")
+    args.command_args = command_args
+    return args
 
 def show_config():
     print(get_config_path().resolve())
@@ -74,19 +113,46 @@ def config_logs(args: ArgNamespace):
     verbosity_logs = logging.StreamHandler()
     verbosity_logs.setLevel(args.verbose)
 
+    file_level = get_config()['logging']['file_level']
+
     debug_logs = logging.FileHandler(args.log, encoding='utf-8')
-    debug_logs.setLevel(logging.DEBUG)
+    debug_logs.setLevel(file_level)
+
+    handlers = [
+        verbosity_logs,
+        debug_logs,
+    ]
+
+    if args.log_json:
+        json_logs = logging.FileHandler(args.log_json, encoding='utf-8')
+        json_logs.setLevel(file_level)
+        json_logs.setFormatter(JsonLinesFormatter())
+        handlers.append(json_logs)
 
     fmt = '%(levelname)s: (%(module)s.%(funcName)s) [%(asctime)s] %(message)s'
     logging.basicConfig(
-        level=logging.DEBUG,
+        level=min(h.level for h in handlers),
         format=fmt,
-        handlers=[
-            verbosity_logs,
-            debug_logs,
-        ],
+        handlers=handlers,
     )
 
+def config_cassette(args: ArgNamespace):
+    """raises ValueError"""
+    if args.record:
+        cassette = Cassette(args.record)
+        cassette.start_recording()
+        global_settings['cassette'] = cassette
+    elif args.replay:
+        cassette = Cassette.load(args.replay)
+        cassette.start_replaying()
+        global_settings['cassette'] = cassette
+        global_settings['replay'] = True
+
+def config_snapshot(args: ArgNamespace):
+    """raises ValueError"""
+    if args.snapshot:
+        global_settings['snapshot'] = Snapshot.load(args.snapshot)
+
 def interactive_mode():
     welcome = "Welcome to YouTube Music Blend!"
     print(welcome)
@@ -98,8 +164,11 @@ def interactive_mode():
             '2': Action(blend_flow, "Create Blend"),
             '3': Action(mixtape_flow, "Create Mixtape"),
             '4': Action(compilation_flow, "Create Compilation"),
+            '5': Action(multi_blend_flow, "Create Multiple Blends"),
             'a': Action(advanced_flow, "Advanced Playlist Creation"),
             't': Action(tracking_flow, "Track Playlist"),
+            'b': Action(bulk_tracking_flow, "Track All Playlists"),
+            's': Action(search_menu, "Search Libraries"),
             'r': Action(routines_menu, "Routines"),
         },
         return_key='q',
@@ -114,21 +183,24 @@ def interactive_mode():
             raise
         logging.critical(f"ytmb crashed:\n{repr(e)}")
 
-def main():
-    args = parse_args()
+def run(args: ArgNamespace):
+    if args.routine in COMMANDS:
+        return COMMANDS[args.routine](args.command_args)
 
-    if args.config:
-        show_config()
+    if args.chain is not None:
+        try:
+            failed = run_chain(args.chain, args.force)
+        except KeyError as e:
+            print(f"Routine not found: {e}")
+            return 1
+        except ValueError as e:
+            print(e)
+            return 1
+        if failed:
+            print(f"Failed routines: {', '.join(sorted(failed))}")
+            return 1
         return
 
-    match args.log:
-        case LogOptions.SHOW_LOG:
-            show_logs()
-            return
-
-    config_logs(args)
-    global_settings['debug'] = args.debug
-
     if not args.routine:
         interactive_mode()
         return
@@ -145,7 +217,42 @@ def main():
         print("Program not found.")
         return 1
 
-    automatable.program(routine['args'])
+    run_routine(args.routine, routine, args.force)
+
+def main():
+    args = parse_args()
+
+    if args.config:
+        show_config()
+        return
+
+    match args.log:
+        case LogOptions.SHOW_LOG:
+            show_logs()
+            return
+
+    config_logs(args)
+    global_settings['debug'] = args.debug
+    global_settings['refresh_home'] = args.refresh_home
+    global_settings['force'] = args.force
+
+    try:
+        config_cassette(args)
+    except ValueError:
+        print("Cassette not found.")
+        return 1
+
+    try:
+        config_snapshot(args)
+    except ValueError:
+        print("Snapshot not found.")
+        return 1
+
+    try:
+        return run(args)
+    finally:
+        if args.record:
+            global_settings['cassette'].save()
 
 if __name__ == '__main__':
     sys.exit(main())
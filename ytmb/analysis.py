@@ -0,0 +1,421 @@
+import argparse
+import logging
+from typing import TypedDict, Optional, NamedTuple
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+from itertools import repeat
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
+
+from ytmb.utils import get_config, get_data_directory
+import ytmb.authentication as auth
+import ytmb.track_index as ti
+import ytmb.exploration as ex
+
+
+class PlaylistReport(TypedDict):
+    user: str
+    playlist: str
+    snapshots: int
+    first_audit: Optional[str]
+    last_audit: Optional[str]
+    current_size: int
+    distinct_tracks: int
+    total_added: int
+    total_removed: int
+    mean_churn: float
+    mean_tenure: float
+
+class AuditReport(TypedDict):
+    playlists: list[PlaylistReport]
+    snapshots: int
+    distinct_tracks: int
+    total_added: int
+    total_removed: int
+
+def get_audits_path() -> Path:
+    return get_data_directory(get_config()['tracking']['audits_path'])
+
+def read_audit(p_audit: Path) -> set[str]:
+    with open(p_audit, encoding='utf-8') as f:
+        return {l for l in f.read().split('\n') if l}
+
+def analyze_playlist_audits(str_playlist_audits: str) -> PlaylistReport:
+    p_playlist_audits = Path(str_playlist_audits)
+    p_audits = sorted(p_playlist_audits.glob('*.txt'))
+    tenures = {}
+    total_added = 0
+    total_removed = 0
+    churns = []
+    previous = set()
+    for i, p_audit in enumerate(p_audits):
+        current = read_audit(p_audit)
+        for title in current:
+            tenures[title] = tenures.get(title, 0) + 1
+        if i > 0:
+            num_added = len(current - previous)
+            num_removed = len(previous - current)
+            total_added += num_added
+            total_removed += num_removed
+            churns.append((num_added + num_removed) / max(len(previous), 1))
+        previous = current
+    report: PlaylistReport = {
+        'user': p_playlist_audits.parent.name,
+        'playlist': p_playlist_audits.name,
+        'snapshots': len(p_audits),
+        'first_audit': p_audits[0].stem if p_audits else None,
+        'last_audit': p_audits[-1].stem if p_audits else None,
+        'current_size': len(previous),
+        'distinct_tracks': len(tenures),
+        'total_added': total_added,
+        'total_removed': total_removed,
+        'mean_churn': sum(churns) / len(churns) if churns else 0.0,
+        'mean_tenure': (
+            sum(tenures.values()) / len(tenures) if tenures else 0.0
+        ),
+    }
+    return report
+
+def find_playlist_audits(p_audits: Path, names=None) -> list[Path]:
+    p_users = (
+        [p_audits / n for n in names]
+        if names
+        else sorted(p for p in p_audits.iterdir() if p.is_dir())
+    )
+    return [
+        p for p_user in p_users if p_user.is_dir()
+        for p in sorted(p_user.iterdir()) if p.is_dir()
+    ]
+
+def analyze_audits(
+        names: Optional[list[str]]=None,
+        max_workers: Optional[int]=None,
+        p_audits: Optional[Path]=None,
+) -> AuditReport:
+    playlist_audits = find_playlist_audits(p_audits or get_audits_path(), names)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        playlists = list(executor.map(
+            analyze_playlist_audits,
+            map(str, playlist_audits),
+            chunksize=max(1, len(playlist_audits) // (8 * (max_workers or 4))),
+        ))
+    report: AuditReport = {
+        'playlists': playlists,
+        'snapshots': sum(p['snapshots'] for p in playlists),
+        'distinct_tracks': sum(p['distinct_tracks'] for p in playlists),
+        'total_added': sum(p['total_added'] for p in playlists),
+        'total_removed': sum(p['total_removed'] for p in playlists),
+    }
+    return report
+
+def format_report(report: AuditReport) -> str:
+    lines = [
+        f"{p['user']}/{p['playlist']}: {p['current_size']} tracks, "
+        f"{p['snapshots']} audits ({p['first_audit']} to {p['last_audit']}), "
+        f"+{p['total_added']}/-{p['total_removed']}, "
+        f"churn {p['mean_churn']:.1%}, tenure {p['mean_tenure']:.1f} audits"
+        for p in report['playlists']
+    ]
+    lines.append(
+        f"Total: {len(report['playlists'])} playlists, "
+        f"{report['snapshots']} audits, +{report['total_added']}"
+        f"/-{report['total_removed']}"
+    )
+    return '\n'.join(lines)
+
+def require_numpy():
+    """raises ImportError"""
+    if np is None:
+        raise ImportError(
+            "NumPy is required. Install it with "
+            "pip install youtube_music_blend[analysis]"
+        )
+
+class SketchLabel(NamedTuple):
+    user: str
+    playlistId: str
+    title: str
+
+def get_sketches_path() -> Path:
+    return get_data_directory(get_config()['analysis']['sketches_path'])
+
+def hash_videoIds(videoIds) -> 'np.ndarray':
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(v.encode(), digest_size=8).digest())
+            for v in videoIds
+        ),
+        dtype=np.uint64,
+        count=len(videoIds),
+    )
+
+def get_permutations() -> tuple['np.ndarray', 'np.ndarray']:
+    num_permutations = get_config()['analysis']['minhash_permutations']
+    rng = np.random.default_rng(0)
+    multipliers = rng.integers(
+        0, 2**64, size=num_permutations, dtype=np.uint64
+    ) | np.uint64(1)
+    increments = rng.integers(0, 2**64, size=num_permutations, dtype=np.uint64)
+    return multipliers, increments
+
+def minhash(videoIds, permutations) -> 'np.ndarray':
+    """raises ValueError"""
+    if not videoIds:
+        raise ValueError("Cannot sketch an empty playlist")
+    hashes = hash_videoIds(sorted(set(videoIds)))
+    multipliers, increments = permutations
+    signature = np.empty(len(multipliers), dtype=np.uint64)
+    block_size = max(1, 2**22 // len(hashes))
+    for i in range(0, len(multipliers), block_size):
+        permuted = (multipliers[i:i+block_size, None] * hashes[None, :]
+                    + increments[i:i+block_size, None])
+        signature[i:i+block_size] = permuted.min(axis=1)
+    return signature
+
+def get_sketches(name) -> dict:
+    p_sketches = get_sketches_path() / f'{name}.npz'
+    if not p_sketches.is_file():
+        return {}
+    with np.load(p_sketches) as data:
+        return {
+            str(playlistId): (str(title), str(fingerprint), signature)
+            for playlistId, title, fingerprint, signature in zip(
+                data['playlistIds'],
+                data['titles'],
+                data['fingerprints'],
+                data['signatures'],
+            )
+        }
+
+def write_sketches(name, sketches: dict):
+    p_sketches = get_sketches_path() / f'{name}.npz'
+    num_permutations = get_config()['analysis']['minhash_permutations']
+    entries = list(sketches.items())
+    np.savez_compressed(
+        p_sketches,
+        playlistIds=np.array([p for p, _ in entries], dtype=str),
+        titles=np.array([e[0] for _, e in entries], dtype=str),
+        fingerprints=np.array([e[1] for _, e in entries], dtype=str),
+        signatures=(
+            np.stack([e[2] for _, e in entries])
+            if entries
+            else np.empty((0, num_permutations), dtype=np.uint64)
+        ),
+    )
+
+def update_sketches(name) -> int:
+    """raises ImportError"""
+    require_numpy()
+    ti.update_track_cache(name)
+    sketches = get_sketches(name)
+    permutations = get_permutations()
+    cache = ti.get_track_cache(name)
+    num_sketched = 0
+    for playlistId, entry in cache.items():
+        cached = sketches.get(playlistId)
+        if cached and cached[1] == entry['fingerprint']:
+            continue
+        videoIds = [videoId for videoId, _, _ in entry['tracks']]
+        if not videoIds:
+            sketches.pop(playlistId, None)
+            continue
+        sketches[playlistId] = (
+            entry['title'],
+            entry['fingerprint'],
+            minhash(videoIds, permutations),
+        )
+        num_sketched += 1
+    for playlistId in sketches.keys() - cache.keys():
+        del sketches[playlistId]
+    write_sketches(name, sketches)
+    logging.debug(f"Sketched {num_sketched} playlists for {name}")
+    return num_sketched
+
+def load_sketches(
+        names: Optional[list[str]]=None,
+) -> tuple[list[SketchLabel], 'np.ndarray']:
+    """raises ImportError"""
+    require_numpy()
+    labels = []
+    signatures = []
+    for name in names or auth.get_header_names():
+        for playlistId, (title, _, signature) in get_sketches(name).items():
+            labels.append(SketchLabel(name, playlistId, title))
+            signatures.append(signature)
+    num_permutations = get_config()['analysis']['minhash_permutations']
+    if not signatures:
+        return labels, np.empty((0, num_permutations), dtype=np.uint64)
+    return labels, np.stack(signatures)
+
+def _jaccard_blocks(signatures, others):
+    block_size = max(1, 2**26 // max(1, others.size))
+    for i in range(0, len(signatures), block_size):
+        yield i, (
+            signatures[i:i+block_size, None, :] == others[None, :, :]
+        ).mean(axis=2, dtype=np.float32)
+
+def jaccard_matrix(signatures) -> 'np.ndarray':
+    """raises ImportError"""
+    require_numpy()
+    similarity = np.empty((len(signatures), len(signatures)), dtype=np.float32)
+    for i, block in _jaccard_blocks(signatures, signatures):
+        similarity[i:i+len(block)] = block
+    return similarity
+
+def similar_pairs(
+        labels: list[SketchLabel],
+        signatures,
+        threshold=0.5,
+) -> list[tuple[float, SketchLabel, SketchLabel]]:
+    """raises ImportError"""
+    require_numpy()
+    pairs = []
+    for i, block in _jaccard_blocks(signatures, signatures):
+        rows, columns = np.nonzero(np.triu(block >= threshold, k=i + 1))
+        pairs.extend(
+            (float(block[r, c]), labels[i + r], labels[c])
+            for r, c in zip(rows.tolist(), columns.tolist())
+        )
+    return sorted(pairs, key=lambda p: p[0], reverse=True)
+
+def user_similarity(
+        labels: list[SketchLabel],
+        signatures,
+) -> tuple[list[str], 'np.ndarray']:
+    """raises ImportError"""
+    require_numpy()
+    users = list(dict.fromkeys(l.user for l in labels))
+    user_index = np.array([users.index(l.user) for l in labels], dtype=np.intp)
+    library_signatures = np.full(
+        (len(users), signatures.shape[1]),
+        np.iinfo(np.uint64).max,
+        dtype=np.uint64,
+    )
+    np.minimum.at(library_signatures, user_index, signatures)
+    return users, jaccard_matrix(library_signatures)
+
+def require_scipy():
+    """raises ImportError"""
+    require_numpy()
+    if sp is None:
+        raise ImportError(
+            "SciPy is required. Install it with "
+            "pip install youtube_music_blend[analysis]"
+        )
+
+def get_taste_features(name, pool: Optional[ex.HomePool]=None) -> dict:
+    features = {}
+    for entry in ti.get_track_cache(name).values():
+        for videoId, _, artists in entry['tracks']:
+            features[f'track:{videoId}'] = 1.0
+            for artist in artists.split(', ') if artists else []:
+                key = f'artist:{artist.casefold()}'
+                features[key] = features.get(key, 0.0) + 1.0
+    for listing, _ in (pool or ex.HomePool(name)).listings:
+        if videoId := listing.get('videoId'):
+            features[f'track:{videoId}'] = 1.0
+        for artist in listing.get('artists') or []:
+            key = f"artist:{artist['name'].casefold()}"
+            features[key] = features.get(key, 0.0) + 1.0
+    return features
+
+def build_taste_matrix(feature_sets: list[dict]):
+    """raises ImportError"""
+    require_scipy()
+    vocabulary = {}
+    rows = []
+    columns = []
+    values = []
+    for i, features in enumerate(feature_sets):
+        rows.extend(repeat(i, len(features)))
+        columns.extend(
+            vocabulary.setdefault(f, len(vocabulary)) for f in features
+        )
+        values.extend(features.values())
+    matrix = sp.csr_matrix(
+        (
+            np.log1p(np.array(values, dtype=np.float32)),
+            (np.array(rows), np.array(columns)),
+        ),
+        shape=(len(feature_sets), len(vocabulary)),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1.0
+    return sp.diags(1 / norms) @ matrix
+
+def taste_match(
+        names: list[str],
+        pools: Optional[dict[str, ex.HomePool]]=None,
+) -> 'np.ndarray':
+    """raises ImportError"""
+    require_scipy()
+    pools = pools or {}
+    for name in names:
+        ti.update_track_cache(name)
+    matrix = build_taste_matrix(
+        [get_taste_features(name, pools.get(name)) for name in names]
+    )
+    return (matrix @ matrix.T).toarray()
+
+def taste_weights(
+        names: list[str],
+        pools: Optional[dict[str, ex.HomePool]]=None,
+) -> dict[str, float]:
+    """raises ImportError"""
+    if len(names) < 2:
+        return {name: 1.0 for name in names}
+    scores = taste_match(names, pools)
+    np.fill_diagonal(scores, 0.0)
+    mean_scores = scores.sum(axis=1) / (len(names) - 1)
+    floor = get_config()['analysis']['taste_weight_floor']
+    weights = {
+        name: floor + float(score) for name, score in zip(names, mean_scores)
+    }
+    logging.debug(
+        "Taste weights: "
+        + ", ".join(f"{n} {w:.2f}" for n, w in weights.items())
+    )
+    return weights
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ytmb analyze')
+    parser.add_argument('--user', action='append', dest='names')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--similarity', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--taste', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.taste:
+        names = args.names or auth.get_header_names()
+        scores = taste_match(names)
+        for i, j in zip(*np.triu_indices(len(names), k=1)):
+            print(f"{names[i]} ~ {names[j]}: {scores[i, j]:.1%} taste match")
+        return
+
+    if args.similarity:
+        for name in args.names or auth.get_header_names():
+            update_sketches(name)
+        labels, signatures = load_sketches(args.names)
+        users, library_similarity = user_similarity(labels, signatures)
+        for i, j in zip(*np.triu_indices(len(users), k=1)):
+            print(f"{users[i]} ~ {users[j]}: {library_similarity[i, j]:.1%}")
+        for score, a, b in similar_pairs(labels, signatures, args.threshold):
+            print(f"{score:.1%}: {a.user}/{a.title} ~ {b.user}/{b.title}")
+        return
+
+    report = analyze_audits(args.names, args.workers)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
@@ -5,7 +5,14 @@ from functools import cache
 import ytmusicapi
 from ytmusicapi import YTMusic
 
-from ytmb.utils import is_ok_filename, get_data_directory, get_config
+from ytmb.utils import (
+    global_settings,
+    is_ok_filename,
+    get_data_directory,
+    get_config,
+)
+from ytmb.cassette import RecordingClient, ReplayingClient
+from ytmb.snapshot import SnapshotClient
 
 
 def get_headers_path() -> Path:
@@ -34,4 +41,12 @@ def get_header_names() -> list:
 
 @cache
 def get_client(name) -> YTMusic:
-    return YTMusic(str(name_to_path(name).resolve()))
+    if snapshot := global_settings['snapshot']:
+        return SnapshotClient(name, snapshot)
+    cassette = global_settings['cassette']
+    if cassette and global_settings['replay']:
+        return ReplayingClient(name, cassette)
+    client = YTMusic(str(name_to_path(name).resolve()))
+    if cassette:
+        return RecordingClient(name, client, cassette)
+    return client
@@ -1,32 +1,75 @@
+import logging
 from dataclasses import dataclass
-from typing import Callable, TypedDict
+from typing import Callable, TypedDict, NotRequired, Optional
+from pathlib import Path
+from collections import defaultdict
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
 
 from ytmb.utils import get_config, get_data_path
-from ytmb.menus.blend import blend_args, process_blend
+from ytmb.menus.blend import (
+    blend_args,
+    process_blend,
+    multi_blend_args,
+    process_multi_blend,
+)
 from ytmb.menus.mixtape import mixtape_args, process_mixtape
-from ytmb.menus.compilation import compilation_args, process_compilation
-from ytmb.menus.advanced import advanced_args, process_advanced
-from ytmb.menus.tracking import tracking_args, process_tracking
+from ytmb.menus.compilation import (
+    compilation_args,
+    process_compilation,
+    compilation_fingerprint,
+)
+from ytmb.menus.advanced import (
+    advanced_args,
+    process_advanced,
+    advanced_fingerprint,
+)
+import ytmb.playlists as pl
+from ytmb.menus.tracking import (
+    tracking_args,
+    process_tracking,
+    bulk_tracking_args,
+    process_bulk_tracking,
+)
 
 
 @dataclass
 class Automatable:
     parameterizer: Callable[[], dict]
     program: Callable[[dict], None]
+    fingerprinter: Optional[Callable[[dict], Optional[str]]] = None
 
 AUTOMATABLES = {
     'Automated Blend': Automatable(blend_args, process_blend),
+    'Automated Multi-Blend': Automatable(multi_blend_args, process_multi_blend),
     'Automated Mixtape': Automatable(mixtape_args, process_mixtape),
-    'Automated Compilation': Automatable(compilation_args, process_compilation),
-    'Automated Advanced Playlist Creation': Automatable(advanced_args, process_advanced),
+    'Automated Compilation': Automatable(
+        compilation_args,
+        process_compilation,
+        compilation_fingerprint,
+    ),
+    'Automated Advanced Playlist Creation': Automatable(
+        advanced_args,
+        process_advanced,
+        advanced_fingerprint,
+    ),
     'Automated Tracking': Automatable(tracking_args, process_tracking),
+    'Automated Bulk Tracking': Automatable(
+        bulk_tracking_args,
+        process_bulk_tracking,
+    ),
 }
 
+COMMAND_NAMES = {'history', 'analyze', 'export', 'import'}
+
+TRACKING_PROGRAMS = {'Automated Tracking', 'Automated Bulk Tracking'}
+
 class Routine(TypedDict):
     prog: str
     desc: str
     args: dict
+    depends_on: NotRequired[list[str]]
 
 def get_routines() -> dict[str, Routine]:
     p_routines = get_data_path() / get_config()['automation']['routines_path']
@@ -42,6 +85,9 @@ def write_routines(routines: dict[str, Routine]):
         json.dump(routines, f, indent=4)
 
 def add_routine(name: str, routine: Routine):
+    """raises ValueError"""
+    if name in COMMAND_NAMES:
+        raise ValueError(f"{name} is the name of a command")
     routines = get_routines()
     routines[name] = routine
     write_routines(routines)
@@ -50,3 +96,185 @@ def remove_routine(name: str):
     routines = get_routines()
     del routines[name]
     write_routines(routines)
+
+def get_fingerprints_path() -> Path:
+    return get_data_path() / get_config()['automation']['fingerprints_path']
+
+def get_fingerprints() -> dict[str, str]:
+    p_fingerprints = get_fingerprints_path()
+    if not p_fingerprints.is_file():
+        return {}
+    with open(p_fingerprints, encoding='utf-8') as f:
+        return json.load(f)
+
+fingerprints_lock = Lock()
+
+def write_fingerprint(name: str, fingerprint: Optional[str]):
+    with fingerprints_lock:
+        fingerprints = get_fingerprints()
+        if fingerprint:
+            fingerprints[name] = fingerprint
+        else:
+            fingerprints.pop(name, None)
+        p_fingerprints = get_fingerprints_path()
+        p_fingerprints.parent.mkdir(parents=True, exist_ok=True)
+        with open(p_fingerprints, 'w', encoding='utf-8') as f:
+            json.dump(fingerprints, f, indent=4)
+
+def run_routine(name: str, routine: Routine, force=False):
+    """raises KeyError"""
+    automatable = AUTOMATABLES[routine['prog']]
+    fingerprinter = automatable.fingerprinter
+    if fingerprinter and not force:
+        fingerprint = fingerprinter(routine['args'])
+        if fingerprint and get_fingerprints().get(name) == fingerprint:
+            logging.info(f"Inputs of routine {name} unchanged. Skipping.")
+            return
+    automatable.program(routine['args'])
+    if fingerprinter:
+        write_fingerprint(name, fingerprinter(routine['args']))
+
+def get_routine_targets(routine: Routine) -> set[str]:
+    args = routine['args']
+    targets = {b['target_playlist'] for b in args.get('blends', [])}
+    if 'target_playlist' in args:
+        targets.add(args['target_playlist'])
+    return targets
+
+def get_routine_sources(routine: Routine) -> set[str]:
+    args = routine['args']
+    sources = set(args.get('source_playlists', []))
+    if 'playlist' in args:
+        sources.add(args['playlist'])
+    return sources
+
+def get_routine_resources(routine: Routine) -> set[str]:
+    args = routine['args']
+    resources = get_routine_targets(routine)
+    source_users = set(args.get('source_users', []))
+    for blend in args.get('blends', []):
+        source_users.update(blend['source_users'])
+    resources.update(f'home:{user}' for user in source_users)
+    if routine['prog'] in TRACKING_PROGRAMS:
+        resources.add('audits')
+    return resources
+
+def get_dependencies(routines: dict[str, Routine]) -> dict[str, set[str]]:
+    """raises ValueError"""
+    writers = defaultdict(list)
+    for name, routine in routines.items():
+        for playlistId in get_routine_targets(routine):
+            writers[playlistId].append(name)
+    dependencies = {}
+    for name, routine in routines.items():
+        depends_on = set(routine.get('depends_on', []))
+        if unknown := depends_on - routines.keys():
+            raise ValueError(f"Unknown dependencies of {name}: {unknown}")
+        for playlistId in get_routine_sources(routine):
+            depends_on.update(writers[playlistId])
+        for playlistId in get_routine_targets(routine):
+            same_target = writers[playlistId]
+            depends_on.update(same_target[:same_target.index(name)])
+        depends_on.discard(name)
+        dependencies[name] = depends_on
+    return dependencies
+
+def order_routines(dependencies: dict[str, set[str]]) -> list[str]:
+    """raises ValueError"""
+    remaining = {n: len(d) for n, d in dependencies.items()}
+    dependents = defaultdict(list)
+    for name, depends_on in dependencies.items():
+        for dependency in depends_on:
+            dependents[dependency].append(name)
+    order = [n for n, r in remaining.items() if not r]
+    for name in order:
+        for dependent in dependents[name]:
+            remaining[dependent] -= 1
+            if not remaining[dependent]:
+                order.append(dependent)
+    if len(order) != len(dependencies):
+        cycle = [n for n, r in remaining.items() if r]
+        raise ValueError(f"Routines depend on each other: {cycle}")
+    return order
+
+def run_chain(
+        names: Optional[list[str]]=None,
+        force=False,
+        max_workers: Optional[int]=None,
+) -> set[str]:
+    """raises KeyError, ValueError"""
+    routines = get_routines()
+    dependencies = get_dependencies(routines)
+    selected = set()
+    to_select = list(names or routines)
+    while to_select:
+        name = to_select.pop()
+        if name not in routines:
+            raise KeyError(f"Routine {name} not found")
+        if name not in selected:
+            selected.add(name)
+            to_select.extend(dependencies[name])
+    dependencies = {n: dependencies[n] for n in selected}
+    order = order_routines(dependencies)
+    logging.info(f"Running routines: {', '.join(order)}")
+
+    dependents = defaultdict(list)
+    for name in order:
+        for dependency in dependencies[name]:
+            dependents[dependency].append(name)
+    remaining = {n: len(dependencies[n]) for n in order}
+    failed = set()
+
+    def release(name) -> list[str]:
+        ready = []
+        finished = [name]
+        while finished:
+            for dependent in dependents[finished.pop()]:
+                remaining[dependent] -= 1
+                if remaining[dependent]:
+                    continue
+                if dependencies[dependent] & failed:
+                    logging.warning(
+                        f"Skipping routine {dependent} after a failed "
+                        "dependency"
+                    )
+                    failed.add(dependent)
+                    finished.append(dependent)
+                else:
+                    ready.append(dependent)
+        return ready
+
+    waiting = [n for n in order if not remaining[n]]
+    busy_resources = set()
+
+    def start_ready() -> dict:
+        started = {}
+        for name in list(waiting):
+            resources = get_routine_resources(routines[name])
+            if resources & busy_resources:
+                continue
+            waiting.remove(name)
+            busy_resources.update(resources)
+            future = executor.submit(run_routine, name, routines[name], force)
+            started[future] = name
+        return started
+
+    max_workers = max_workers or get_config()['automation']['max_workers']
+    with pl.handoff_scope(), ThreadPoolExecutor(max_workers) as executor:
+        running = start_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                busy_resources.difference_update(
+                    get_routine_resources(routines[name])
+                )
+                try:
+                    future.result()
+                    logging.info(f"Routine {name} finished")
+                except Exception as e:
+                    logging.error(f"Routine {name} failed:\n{repr(e)}")
+                    failed.add(name)
+                waiting.extend(release(name))
+            running.update(start_ready())
+    return failed
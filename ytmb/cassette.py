@@ -0,0 +1,120 @@
+import logging
+from pathlib import Path
+from threading import Lock
+from collections import defaultdict
+import gzip
+import json
+import random
+
+from ytmb.utils import get_config, get_data_directory
+
+
+def get_cassettes_path() -> Path:
+    return get_data_directory(get_config()['cassette']['cassettes_path'])
+
+def name_to_path(name) -> Path:
+    return get_cassettes_path() / f'{name}.json.gz'
+
+def is_existing_cassette(name) -> bool:
+    return name_to_path(name).is_file()
+
+def make_key(user, method, args, kwargs) -> str:
+    return json.dumps(
+        [user, method, args, kwargs],
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str,
+    )
+
+class Cassette:
+    def __init__(self, name) -> None:
+        self.name = name
+        self.seed = None
+        self.__interactions = defaultdict(list)
+        self.__plays = defaultdict(int)
+        self.__lock = Lock()
+
+    def record(self, key, response=None, error=None) -> None:
+        entry = {'error': error} if error else {'response': response}
+        with self.__lock:
+            self.__interactions[key].append(entry)
+
+    def play(self, key):
+        """raises KeyError, RuntimeError"""
+        with self.__lock:
+            entries = self.__interactions.get(key)
+            if not entries:
+                raise KeyError(f"No recorded response for {key}")
+            index = min(self.__plays[key], len(entries) - 1)
+            self.__plays[key] += 1
+        entry = entries[index]
+        if 'error' in entry:
+            raise RuntimeError(f"Recorded error: {entry['error']}")
+        return entry['response']
+
+    def start_recording(self) -> None:
+        self.seed = random.randrange(2**32)
+        random.seed(self.seed)
+
+    def start_replaying(self) -> None:
+        random.seed(self.seed)
+
+    def save(self) -> None:
+        with self.__lock:
+            data = {
+                'seed': self.seed,
+                'interactions': self.__interactions,
+            }
+            with gzip.open(name_to_path(self.name), 'wt', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+        msg = (f"Saved {len(self.__interactions)} distinct calls to cassette "
+               f"{self.name}")
+        logging.debug(msg)
+
+    @classmethod
+    def load(cls, name) -> 'Cassette':
+        """raises ValueError"""
+        if not is_existing_cassette(name):
+            raise ValueError("Cassette not found")
+        with gzip.open(name_to_path(name), 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        cassette = cls(name)
+        cassette.seed = data['seed']
+        for key, entries in data['interactions'].items():
+            cassette.__interactions[key].extend(entries)
+        return cassette
+
+class RecordingClient:
+    def __init__(self, user, client, cassette: Cassette) -> None:
+        self.__user = user
+        self.__client = client
+        self.__cassette = cassette
+
+    def __getattr__(self, method):
+        attr = getattr(self.__client, method)
+        if not callable(attr):
+            return attr
+        def recorded(*args, **kwargs):
+            key = make_key(self.__user, method, args, kwargs)
+            try:
+                response = attr(*args, **kwargs)
+            except Exception as e:
+                self.__cassette.record(key, error=repr(e))
+                raise
+            self.__cassette.record(
+                key,
+                response=json.loads(json.dumps(response, default=str)),
+            )
+            return response
+        return recorded
+
+class ReplayingClient:
+    def __init__(self, user, cassette: Cassette) -> None:
+        self.__user = user
+        self.__cassette = cassette
+
+    def __getattr__(self, method):
+        def replayed(*args, **kwargs):
+            key = make_key(self.__user, method, args, kwargs)
+            return self.__cassette.play(key)
+        return replayed
@@ -1,14 +1,25 @@
 import logging
 from typing import TypedDict, NotRequired, Optional, NamedTuple
+from collections.abc import Iterator
 from pathlib import Path
 from collections import defaultdict
 from functools import partial
 import random
+import json
+import time
+import math
 from itertools import repeat, zip_longest
+from queue import Queue
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor
 
-from ytmb.utils import get_config, get_data_directory
+from ytmb.utils import global_settings, get_config, get_data_directory
 import ytmb.authentication as auth
 import ytmb.playlists as pl
+import ytmb.journal as jr
+from ytmb.filtering import SectionFilter, load_rules, filter_home
+from ytmb.logs import Lazy
+from ytmb.recency import RecentTracks
 
 
 class Track(TypedDict):
@@ -68,23 +79,45 @@ def get_blacklist_path() -> Path:
         get_config()['blend']['filtering']['blacklist_path']
     )
 
-def get_whitelist(name) -> Optional[set]:
-    p_whitelist = get_whitelist_path() / f'{name}.txt'
-    if not p_whitelist.is_file():
-        return None
-    with open(p_whitelist) as f:
-        return {l for l in f.read().split('\n') if l}
+def get_whitelist_rules(name) -> Optional[SectionFilter]:
+    return load_rules(get_whitelist_path() / f'{name}.txt')
+
+def get_blacklist_rules(name) -> Optional[SectionFilter]:
+    return load_rules(get_blacklist_path() / f'{name}.txt')
 
-def get_blacklist(name) -> Optional[set]:
-    p_blacklist = get_blacklist_path() / f'{name}.txt'
-    if not p_blacklist.is_file():
+def get_home_cache_path() -> Path:
+    return get_data_directory(get_config()['blend']['home_cache']['cache_path'])
+
+def get_cached_home(name) -> Optional[list[HomeSection]]:
+    p_home = get_home_cache_path() / f'{name}.json'
+    if not p_home.is_file():
+        return None
+    age = time.time() - p_home.stat().st_mtime
+    if age >= get_config()['blend']['home_cache']['ttl']:
         return None
-    with open(p_blacklist) as f:
-        return {l for l in f.read().split('\n') if l}
+    with open(p_home, encoding='utf-8') as f:
+        resp = json.load(f)
+    logging.debug(
+        f"Found {len(resp)} cached home sections for {name} ({age:.0f}s old)"
+    )
+    return resp
 
-def get_home(name) -> list[HomeSection]:
+def write_cached_home(name, home: list[HomeSection]):
+    p_home = get_home_cache_path() / f'{name}.json'
+    p_partial = p_home.with_suffix('.partial')
+    with open(p_partial, 'w', encoding='utf-8') as f:
+        json.dump(home, f)
+    p_partial.replace(p_home)
+
+def get_home(name, force_refresh=False) -> list[HomeSection]:
+    live = not (global_settings['cassette'] or global_settings['snapshot'])
+    use_cache = live and not (force_refresh or global_settings['refresh_home'])
+    if use_cache and (resp := get_cached_home(name)) is not None:
+        return resp
     resp = auth.get_client(name).get_home(limit=float('inf'))
     logging.debug(f"Found {len(resp)} home sections for {name}")
+    if live:
+        write_cached_home(name, resp)
     return resp
 
 def get_radio_tracks(name, radio):
@@ -119,92 +152,157 @@ class LabeledListing(NamedTuple):
     listing: Listing
     section: HomeSection
 
-class HomeSampler:
-    def __init__(self, name) -> None:
+class ListingMemo:
+    def __init__(self, ttl=None) -> None:
+        self.ttl = ttl
+        self.__entries = {}
+        self.__locks = {}
+        self.__lock = Lock()
+
+    def resolve(self, key, fetch) -> Optional[list[Track]]:
+        ttl = self.ttl or get_config()['blend']['home_cache']['ttl']
+        with self.__lock:
+            key_lock = self.__locks.setdefault(key, Lock())
+        with key_lock:
+            entry = self.__entries.get(key)
+            if entry and time.monotonic() - entry[0] < ttl:
+                logging.debug(f"Reusing {len(entry[1])} tracks from {key}")
+                return entry[1]
+            tracks = fetch()
+            if tracks:
+                self.__entries[key] = (time.monotonic(), tracks)
+            return tracks
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.__locks.clear()
+
+listing_memo = ListingMemo()
+
+class HomePool:
+    def __init__(
+            self,
+            name,
+            force_refresh=False,
+            memo: Optional[ListingMemo]=None,
+    ) -> None:
         self.name = name
-        self.home = get_home(name)
-        if whitelist := get_whitelist(name):
-            self.home = [hs for hs in self.home if hs['title'] in whitelist]
-            msg = (f"Sections found from {name}'s whitelist: "
-                   + ", ".join(hs['title'] for hs in self.home))
-            logging.debug(msg)
-        elif blacklist := get_blacklist(name):
-            self.home = [hs for hs in self.home if hs['title'] not in blacklist]
-            msg = (f"Remaining sections not on {name}'s blacklist: "
-                   + ", ".join(hs['title'] for hs in self.home))
-            logging.debug(msg)
-        self.all_listings = [
-            LabeledListing(l, hs) for hs in self.home for l in hs['contents']
+        self.memo = memo or listing_memo
+        self.home = get_home(name, force_refresh)
+        whitelist = get_whitelist_rules(name)
+        blacklist = None if whitelist else get_blacklist_rules(name)
+        self.listings = [
+            LabeledListing(l, hs)
+            for l, hs in filter_home(self.home, whitelist, blacklist)
         ]
-        self.selections = defaultdict(partial(defaultdict, set))
-
-    def empty(self) -> bool:
-        return len(self.all_listings) == 0
+        if whitelist or blacklist:
+            sections = dict.fromkeys(hs['title'] for _, hs in self.listings)
+            msg = (f"Sections remaining after {name}'s filters: "
+                   + ", ".join(sections))
+            logging.debug(msg)
 
-    def sample(self) -> Optional[Track]:
-        listing, section = self.all_listings.pop(
-            random.randrange(len(self.all_listings))
-        )
+    def _fetch(self, listing) -> Optional[list[Track]]:
         match listing:
-            case {'videoId': _}:
-                logging.debug(f"Found song {listing['title']}")
-                self.selections[section['title']]['Songs'].add(listing['title'])
-                return listing
             case {'playlistId': _, 'count': _}:
                 playlist = pl.get_tracks(self.name, listing)
                 msg = (f"Found {len(playlist)} tracks in playlist "
                        f"{listing['title']}")
                 logging.debug(msg)
-                try:
-                    track = random.choice(playlist)
-                except IndexError:
-                    return None
-                self.selections[section['title']][listing['title']].add(
-                    track['title']
-                )
-                return track
+                return playlist
             case {'playlistId': _}:
                 radio = get_radio_tracks(self.name, listing)
                 msg = (f"Choosing from {len(radio)} tracks from radio "
                        f"{listing['title']}")
                 logging.debug(msg)
-                try:
-                    track = random.choice(radio)
-                except IndexError:
-                    return None
-                self.selections[section['title']][listing['title']].add(
-                    track['title']
-                )
-                return track
+                return radio
             case {'type': _}:
                 album = get_album_tracks(self.name, listing)
                 msg = f"Found {len(album)} tracks in album {listing['title']}"
                 logging.debug(msg)
-                try:
-                    track = random.choice(album)
-                except IndexError:
-                    return None
-                self.selections[section['title']][listing['title']].add(
-                    track['title']
-                )
-                return track
+                return album
             case {'subscribers': _}:
                 artist = get_artist_tracks(self.name, listing)
                 msg = f"Found {len(artist)} tracks by artist {listing['title']}"
                 logging.debug(msg)
-                try:
-                    track = random.choice(artist)
-                except IndexError:
-                    return None
-                self.selections[section['title']][listing['title']].add(
-                    track['title']
-                )
-                return track
+                return artist
             case _:
-                msg = f"Listing not matched:\n{listing}\nSection:\n{section}"
-                logging.warn(msg)
                 return None
 
+    def resolve(self, listing) -> Optional[list[Track]]:
+        key = listing.get('playlistId') or listing.get('browseId')
+        return self.memo.resolve(key, partial(self._fetch, listing))
+
+def load_recent_tracks(name) -> Optional[RecentTracks]:
+    if (get_config()['blend']['recency']['max_size'] <= 0
+            or global_settings['cassette']
+            or global_settings['snapshot']):
+        return None
+    return RecentTracks.load(name)
+
+class HomeSampler:
+    def __init__(
+            self,
+            name,
+            force_refresh=False,
+            pool: Optional[HomePool]=None,
+            rng: Optional[random.Random]=None,
+            recent: Optional[RecentTracks]=None,
+    ) -> None:
+        self.name = name
+        self.pool = pool or HomePool(name, force_refresh)
+        self.rng = rng or random
+        self.recent = recent
+        self.home = self.pool.home
+        self.all_listings = list(self.pool.listings)
+        self.selections = defaultdict(partial(defaultdict, set))
+
+    def empty(self) -> bool:
+        return len(self.all_listings) == 0
+
+    def sample(self) -> Optional[Track]:
+        listing, section = self.all_listings.pop(
+            self.rng.randrange(len(self.all_listings))
+        )
+        match listing:
+            case {'videoId': videoId}:
+                if self.recent and self.recent.is_recent(videoId):
+                    logging.debug(f"Skipping recent song {listing['title']}")
+                    return None
+                logging.debug(f"Found song {listing['title']}")
+                self.selections[section['title']]['Songs'].add(listing['title'])
+                self._use(listing)
+                return listing
+        key = listing.get('playlistId') or listing.get('browseId')
+        if self.recent and self.recent.is_exhausted(key):
+            logging.debug(f"Skipping exhausted listing {listing['title']}")
+            return None
+        tracks = self.pool.resolve(listing)
+        if tracks is None:
+            msg = f"Listing not matched:\n{listing}\nSection:\n{section}"
+            logging.warn(msg)
+            return None
+        candidates = tracks
+        if self.recent:
+            candidates = [
+                t for t in tracks if not self.recent.is_recent(t.get('videoId'))
+            ]
+            if tracks and not candidates:
+                logging.debug(f"All tracks in {listing['title']} used recently")
+                self.recent.exhaust(key, [t.get('videoId') for t in tracks])
+                return None
+        try:
+            track = self.rng.choice(candidates)
+        except IndexError:
+            return None
+        self.selections[section['title']][listing['title']].add(track['title'])
+        self._use(track)
+        return track
+
+    def _use(self, track) -> None:
+        if self.recent and track.get('videoId'):
+            self.recent.use(track['videoId'])
+
     def _format_collection(self, tracks) -> str:
         return '\n'.join(f'\t\t{track}' for track in tracks)
 
@@ -220,34 +318,260 @@ class HomeSampler:
             for section, collections in sorted(self.selections.items())
         )
 
-def sample_home(name, k) -> list[Track]:
-    sampler = HomeSampler(name)
-    tracks = []
-    while not sampler.empty() and len(tracks) < k:
-        track = sampler.sample()
-        if track:
-            tracks.append(track)
-    if len(tracks) != k:
+def iter_home_samples(
+        name,
+        k,
+        pool: Optional[HomePool]=None,
+        rng: Optional[random.Random]=None,
+        exclude: Optional[set[str]]=None,
+) -> Iterator[Track]:
+    recent = load_recent_tracks(name)
+    sampler = HomeSampler(name, pool=pool, rng=rng, recent=recent)
+    num_sampled = 0
+    try:
+        while not sampler.empty() and num_sampled < k:
+            track = sampler.sample()
+            if not track:
+                continue
+            if exclude is not None:
+                if track.get('videoId') in exclude:
+                    continue
+                exclude.add(track.get('videoId'))
+            num_sampled += 1
+            yield track
+    finally:
+        if recent:
+            recent.save()
+    if num_sampled != k:
         msg = (f"Could not sample enough tracks from {name}'s home. Missing "
-               f"{k - len(tracks)} tracks.")
+               f"{k - num_sampled} tracks.")
         logging.warn(msg)
-    logging.info(f"{name}'s selections:\n{sampler.format_selections()}")
-    return tracks
+    logging.info("%s's selections:\n%s", name, Lazy(sampler.format_selections))
+
+def sample_home(name, k, pool: Optional[HomePool]=None) -> list[Track]:
+    return list(iter_home_samples(name, k, pool))
+
+def _feed_samples(queue: Queue, stop: Event, *args):
+    try:
+        for track in iter_home_samples(*args):
+            if stop.is_set():
+                break
+            queue.put(track)
+    finally:
+        queue.put(None)
+
+def apportion(
+        blend_length,
+        source_names,
+        weights: Optional[dict[str, float]]=None,
+) -> list[int]:
+    if not weights:
+        num_per_user, padding = divmod(blend_length, len(source_names))
+        return [
+            num_per_user + num_extra
+            for _, num_extra
+            in zip_longest(source_names, repeat(1, padding), fillvalue=0)
+        ]
+    total_weight = sum(weights.get(user, 0.0) for user in source_names)
+    if total_weight <= 0:
+        return apportion(blend_length, source_names)
+    quotas = [
+        blend_length * weights.get(user, 0.0) / total_weight
+        for user in source_names
+    ]
+    counts = [int(q) for q in quotas]
+    by_remainder = sorted(
+        range(len(quotas)),
+        key=lambda i: quotas[i] - counts[i],
+        reverse=True,
+    )
+    for i in by_remainder[:blend_length - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+def get_rotations_path() -> Path:
+    return get_data_directory(get_config()['blend']['rotation_path'])
+
+def get_rotation(playlist) -> dict[str, float]:
+    p_rotation = get_rotations_path() / f"{playlist['playlistId']}.json"
+    if not p_rotation.is_file():
+        return {}
+    with open(p_rotation, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_rotation(playlist, rotation: dict[str, float]):
+    p_rotation = get_rotations_path() / f"{playlist['playlistId']}.json"
+    p_partial = p_rotation.with_suffix('.partial')
+    with open(p_partial, 'w', encoding='utf-8') as f:
+        json.dump(rotation, f)
+    p_partial.replace(p_rotation)
+
+def rotate_blend(
+        name,
+        source_names,
+        target_playlist,
+        blend_length=get_config()['blend']['default_length'],
+        rotation=0.25,
+        pools: Optional[dict[str, HomePool]]=None,
+        weights: Optional[dict[str, float]]=None,
+):
+    old_tracks = pl.get_tracks(name, target_playlist)
+    added_at = get_rotation(target_playlist)
+    oldest_first = sorted(
+        old_tracks,
+        key=lambda t: added_at.get(t['videoId'], 0.0),
+    )
+    num_retired = max(
+        math.ceil(rotation * len(old_tracks)),
+        len(old_tracks) - blend_length,
+    )
+    retired_tracks = oldest_first[:num_retired]
+    kept_tracks = oldest_first[num_retired:]
+    counts = apportion(blend_length - len(kept_tracks), source_names, weights)
+    logging.debug(
+        f"Rotating {len(retired_tracks)} of {len(old_tracks)} tracks out"
+    )
+    pools = pools or {}
+    exclude = {t['videoId'] for t in old_tracks}
+    new_tracks = pl.combine_tracks(
+        [
+            list(iter_home_samples(
+                user,
+                count,
+                pools.get(user),
+                exclude=exclude,
+            ))
+            for user, count in zip(source_names, counts)
+        ],
+        pl.SampleLimit.ALL,
+        pl.SampleMethod.IN_ORDER,
+        pl.CombinationMethod.INTERLEAVED,
+    )
+    journal = jr.start_journal(
+        name,
+        target_playlist,
+        new_tracks,
+        retired_tracks,
+    )
+    now = time.time()
+    write_rotation(target_playlist, {
+        **{t['videoId']: added_at.get(t['videoId'], 0.0) for t in kept_tracks},
+        **{t['videoId']: now for t in new_tracks},
+    })
+    pl.run_journal(name, target_playlist, journal)
+    pl.hand_off(target_playlist, kept_tracks + new_tracks)
+
+def roll_back_blend(name, target_playlist, old_tracks):
+    old_setVideoIds = {t['setVideoId'] for t in old_tracks}
+    added_tracks = [
+        t for t in pl.get_tracks(name, target_playlist)
+        if t.get('setVideoId') not in old_setVideoIds
+    ]
+    logging.warning(f"Removing {len(added_tracks)} partially blended tracks")
+    pl.remove_tracks(name, target_playlist, added_tracks)
+
+def stream_blend(
+        name,
+        source_names,
+        target_playlist,
+        blend_length=get_config()['blend']['default_length'],
+        pools: Optional[dict[str, HomePool]]=None,
+        weights: Optional[dict[str, float]]=None,
+):
+    counts = apportion(blend_length, source_names, weights)
+    chunk_size = get_config()['playlists']['write_chunk_size']
+    pools = pools or {}
+    old_tracks = pl.get_tracks(name, target_playlist)
+    logging.debug(f"Found {len(old_tracks)} tracks")
+    queues = [Queue(maxsize=chunk_size) for _ in source_names]
+    stop = Event()
+    num_added = 0
+    try:
+        with ThreadPoolExecutor(max_workers=len(source_names)) as executor:
+            samplers = {
+                queue: executor.submit(
+                    _feed_samples,
+                    queue,
+                    stop,
+                    user,
+                    count,
+                    pools.get(user),
+                    random.Random(random.getrandbits(64)),
+                )
+                for queue, user, count in zip(queues, source_names, counts)
+            }
+            active_queues = list(queues)
+            try:
+                chunk = []
+                while active_queues:
+                    for queue in list(active_queues):
+                        track = queue.get()
+                        if track is None:
+                            active_queues.remove(queue)
+                            samplers[queue].result()
+                            continue
+                        chunk.append(track)
+                        if len(chunk) >= chunk_size:
+                            logging.debug(f"Adding {len(chunk)} tracks")
+                            num_added += len(chunk)
+                            pl.add_tracks(name, target_playlist, chunk)
+                            chunk = []
+                logging.debug(f"Adding {len(chunk)} tracks")
+                num_added += len(chunk)
+                pl.add_tracks(name, target_playlist, chunk)
+            finally:
+                stop.set()
+                for queue in active_queues:
+                    while queue.get() is not None:
+                        pass
+    except Exception:
+        if num_added:
+            roll_back_blend(name, target_playlist, old_tracks)
+        raise
+    logging.debug(f"Removing old tracks")
+    pl.remove_tracks(name, target_playlist, old_tracks)
 
 def create_blend(
         name,
         source_names,
         target_playlist,
         blend_length=get_config()['blend']['default_length'],
+        pools: Optional[dict[str, HomePool]]=None,
+        pipelined=get_config()['blend']['pipelined'],
+        weights: Optional[dict[str, float]]=None,
+        rotation: Optional[float]=None,
 ):
-    num_per_user, padding = divmod(blend_length, len(source_names))
+    pl.resume_pending_write(name, target_playlist)
+    if rotation is not None:
+        rotate_blend(
+            name,
+            source_names,
+            target_playlist,
+            blend_length,
+            rotation,
+            pools,
+            weights,
+        )
+        return
+    if pipelined:
+        stream_blend(
+            name,
+            source_names,
+            target_playlist,
+            blend_length,
+            pools,
+            weights,
+        )
+        return
+    counts = apportion(blend_length, source_names, weights)
     logging.debug(
-        f"Creating blend with {num_per_user} tracks per user and {padding} "
-        "padding"
+        "Creating blend with "
+        + ", ".join(f"{c} tracks from {u}" for u, c in zip(source_names, counts))
     )
+    pools = pools or {}
     tracks = [
-        sample_home(user, num_per_user + num_extra) for user, num_extra
-        in zip_longest(source_names, repeat(1, padding), fillvalue=0)
+        sample_home(user, count, pools.get(user))
+        for user, count in zip(source_names, counts)
     ]
     all_tracks = pl.combine_tracks(
         tracks,
@@ -256,3 +580,26 @@ def create_blend(
         pl.CombinationMethod.INTERLEAVED,
     )
     pl.overwrite_playlist(name, target_playlist, all_tracks)
+
+def create_blends(
+        name,
+        blends: list[tuple[list[str], Playlist]],
+        blend_length=get_config()['blend']['default_length'],
+        rotation: Optional[float]=None,
+):
+    users = dict.fromkeys(u for source_names, _ in blends for u in source_names)
+    logging.info(f"Fetching home pools for {len(users)} users")
+    pools = {user: HomePool(user) for user in users}
+    for source_names, target_playlist in blends:
+        logging.info(
+            f"Creating blend of {', '.join(source_names)} in "
+            f"{target_playlist['title']}"
+        )
+        create_blend(
+            name,
+            source_names,
+            target_playlist,
+            blend_length,
+            pools,
+            rotation=rotation,
+        )
@@ -0,0 +1,112 @@
+import logging
+from typing import Optional
+from pathlib import Path
+from fnmatch import translate
+import re
+
+
+LISTING_TYPES = {'songs', 'playlists', 'radios', 'albums', 'artists'}
+
+def listing_type(listing) -> Optional[str]:
+    match listing:
+        case {'videoId': _}:
+            return 'songs'
+        case {'playlistId': _, 'count': _}:
+            return 'playlists'
+        case {'playlistId': _}:
+            return 'radios'
+        case {'type': _}:
+            return 'albums'
+        case {'subscribers': _}:
+            return 'artists'
+        case _:
+            return None
+
+class SectionFilter:
+    def __init__(self, titles=(), patterns=(), listing_types=()) -> None:
+        self.titles = frozenset(titles)
+        self.patterns = tuple(patterns)
+        self.listing_types = frozenset(listing_types)
+
+    def __bool__(self) -> bool:
+        return bool(self.titles or self.patterns or self.listing_types)
+
+    def has_section_rules(self) -> bool:
+        return bool(self.titles or self.patterns)
+
+    def matches_section(self, title) -> bool:
+        return title in self.titles or any(
+            p.fullmatch(title) for p in self.patterns
+        )
+
+    def matches_listing(self, listing) -> bool:
+        return listing_type(listing) in self.listing_types
+
+def compile_rules(lines) -> SectionFilter:
+    titles = []
+    patterns = []
+    listing_types = []
+    for line in lines:
+        if not line or line.startswith('#'):
+            continue
+        kind, sep, rule = line.partition(':')
+        match kind if sep else None:
+            case 'glob':
+                patterns.append(re.compile(translate(rule)))
+            case 're':
+                try:
+                    patterns.append(re.compile(rule))
+                except re.error as e:
+                    logging.warning(f"Skipping bad regex {rule}: {e}")
+            case 'type':
+                if rule not in LISTING_TYPES:
+                    logging.warning(f"Skipping unknown listing type {rule}")
+                    continue
+                listing_types.append(rule)
+            case _:
+                titles.append(line)
+    return SectionFilter(titles, patterns, listing_types)
+
+_compiled_rules: dict[Path, tuple[int, SectionFilter]] = {}
+
+def load_rules(p_rules: Path) -> Optional[SectionFilter]:
+    try:
+        mtime = p_rules.stat().st_mtime_ns
+    except FileNotFoundError:
+        _compiled_rules.pop(p_rules, None)
+        return None
+    cached = _compiled_rules.get(p_rules)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(p_rules, encoding='utf-8') as f:
+        rules = compile_rules(f.read().split('\n'))
+    logging.debug(f"Compiled filter rules from {p_rules}")
+    _compiled_rules[p_rules] = (mtime, rules)
+    return rules
+
+def filter_home(
+        home,
+        whitelist: Optional[SectionFilter]=None,
+        blacklist: Optional[SectionFilter]=None,
+) -> list[tuple]:
+    labeled_listings = []
+    for section in home:
+        if whitelist:
+            if (whitelist.has_section_rules()
+                    and not whitelist.matches_section(section['title'])):
+                continue
+            listings = [
+                l for l in section['contents']
+                if not whitelist.listing_types or whitelist.matches_listing(l)
+            ]
+        elif blacklist:
+            if blacklist.matches_section(section['title']):
+                continue
+            listings = [
+                l for l in section['contents']
+                if not blacklist.matches_listing(l)
+            ]
+        else:
+            listings = section['contents']
+        labeled_listings.extend((l, section) for l in listings)
+    return labeled_listings
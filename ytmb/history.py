@@ -0,0 +1,187 @@
+import argparse
+from typing import NamedTuple, Optional
+from pathlib import Path
+from datetime import date
+import sqlite3
+
+from ytmb.utils import get_config, get_data_path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memberships (
+    user TEXT NOT NULL,
+    playlist_id TEXT NOT NULL,
+    playlist_title TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT
+);
+CREATE INDEX IF NOT EXISTS memberships_playlist_date
+    ON memberships (playlist_id, start_date);
+CREATE INDEX IF NOT EXISTS memberships_video
+    ON memberships (video_id);
+CREATE TABLE IF NOT EXISTS snapshots (
+    user TEXT NOT NULL,
+    playlist_id TEXT NOT NULL,
+    snapshot_date TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, snapshot_date)
+);
+"""
+
+class Interval(NamedTuple):
+    user: str
+    playlist_id: str
+    playlist_title: str
+    video_id: str
+    title: str
+    start_date: str
+    end_date: Optional[str]
+
+INTERVAL_COLUMNS = ', '.join(Interval._fields)
+
+def get_history_path() -> Path:
+    return get_data_path() / get_config()['tracking']['history_path']
+
+def connect(p_history=None) -> sqlite3.Connection:
+    if p_history is None:
+        p_history = get_history_path()
+        p_history.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(p_history)
+    con.executescript(SCHEMA)
+    return con
+
+def record_snapshot(
+        con: sqlite3.Connection,
+        name,
+        playlist,
+        tracks,
+        snapshot_date: date,
+):
+    day = snapshot_date.isoformat()
+    current = {t['videoId']: t['title'] for t in tracks if t.get('videoId')}
+    open_ids = {
+        video_id for video_id, in con.execute(
+            "SELECT video_id FROM memberships "
+            "WHERE playlist_id = ? AND end_date IS NULL",
+            (playlist['playlistId'],),
+        )
+    }
+    with con:
+        con.executemany(
+            "UPDATE memberships SET end_date = ? "
+            "WHERE playlist_id = ? AND video_id = ? AND end_date IS NULL",
+            [
+                (day, playlist['playlistId'], video_id)
+                for video_id in open_ids - current.keys()
+            ],
+        )
+        con.executemany(
+            f"INSERT INTO memberships ({INTERVAL_COLUMNS}) "
+            "VALUES (?, ?, ?, ?, ?, ?, NULL)",
+            [
+                (
+                    name,
+                    playlist['playlistId'],
+                    playlist['title'],
+                    video_id,
+                    title,
+                    day,
+                )
+                for video_id, title in current.items()
+                if video_id not in open_ids
+            ],
+        )
+        con.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+            (name, playlist['playlistId'], day),
+        )
+
+def get_track_intervals(con: sqlite3.Connection, video_id) -> list[Interval]:
+    rows = con.execute(
+        f"SELECT {INTERVAL_COLUMNS} FROM memberships WHERE video_id = ? "
+        "ORDER BY start_date",
+        (video_id,),
+    )
+    return [Interval(*r) for r in rows]
+
+def get_playlists_with(
+        con: sqlite3.Connection,
+        video_id,
+        at: date,
+) -> list[Interval]:
+    rows = con.execute(
+        f"SELECT {INTERVAL_COLUMNS} FROM memberships WHERE video_id = ? "
+        "AND start_date <= ? AND (end_date IS NULL OR end_date > ?)",
+        (video_id, at.isoformat(), at.isoformat()),
+    )
+    return [Interval(*r) for r in rows]
+
+def get_playlist_at(
+        con: sqlite3.Connection,
+        playlist_id,
+        at: date,
+) -> list[Interval]:
+    rows = con.execute(
+        f"SELECT {INTERVAL_COLUMNS} FROM memberships WHERE playlist_id = ? "
+        "AND start_date <= ? AND (end_date IS NULL OR end_date > ?) "
+        "ORDER BY start_date",
+        (playlist_id, at.isoformat(), at.isoformat()),
+    )
+    return [Interval(*r) for r in rows]
+
+def find_titles(con: sqlite3.Connection, text) -> list[Interval]:
+    rows = con.execute(
+        f"SELECT {INTERVAL_COLUMNS} FROM memberships WHERE title LIKE ? "
+        "ORDER BY title, start_date",
+        (f'%{text}%',),
+    )
+    return [Interval(*r) for r in rows]
+
+def get_snapshot_dates(con: sqlite3.Connection, playlist_id) -> list[str]:
+    rows = con.execute(
+        "SELECT snapshot_date FROM snapshots WHERE playlist_id = ? "
+        "ORDER BY snapshot_date",
+        (playlist_id,),
+    )
+    return [d for d, in rows]
+
+def format_interval(interval: Interval) -> str:
+    return (f"{interval.title} ({interval.video_id}) in "
+            f"{interval.user}/{interval.playlist_title}: "
+            f"{interval.start_date} to {interval.end_date or 'now'}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ytmb history')
+    query = parser.add_mutually_exclusive_group(required=True)
+    query.add_argument('--track', metavar='VIDEO_ID')
+    query.add_argument('--playlist', metavar='PLAYLIST_ID')
+    query.add_argument('--title')
+    query.add_argument('--snapshots', metavar='PLAYLIST_ID')
+    parser.add_argument('--at', type=date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    con = connect()
+    if args.snapshots:
+        snapshot_dates = get_snapshot_dates(con, args.snapshots)
+        con.close()
+        if not snapshot_dates:
+            print("No history found.")
+            return 1
+        print('\n'.join(snapshot_dates))
+        return
+    if args.track and args.at:
+        intervals = get_playlists_with(con, args.track, args.at)
+    elif args.track:
+        intervals = get_track_intervals(con, args.track)
+    elif args.playlist:
+        intervals = get_playlist_at(con, args.playlist, args.at or date.today())
+    else:
+        intervals = find_titles(con, args.title)
+    con.close()
+
+    if not intervals:
+        print("No history found.")
+        return 1
+    for interval in intervals:
+        print(format_interval(interval))
@@ -0,0 +1,54 @@
+from typing import TypedDict, NotRequired, Optional
+from pathlib import Path
+import json
+
+from ytmb.utils import get_config, get_data_directory
+
+
+class WriteJournal(TypedDict):
+    name: str
+    playlistId: str
+    adds: list[str]
+    removes: list[dict]
+    added: int
+    removed: int
+    in_flight: NotRequired[bool]
+    old_setVideoIds: NotRequired[list[str]]
+
+def get_journals_path() -> Path:
+    return get_data_directory(get_config()['playlists']['journal_path'])
+
+def playlist_to_path(playlist) -> Path:
+    return get_journals_path() / f"{playlist['playlistId']}.json"
+
+def get_journal(playlist) -> Optional[WriteJournal]:
+    p_journal = playlist_to_path(playlist)
+    if not p_journal.is_file():
+        return None
+    with open(p_journal, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_journal(journal: WriteJournal):
+    p_journal = playlist_to_path(journal)
+    p_partial = p_journal.with_suffix('.partial')
+    with open(p_partial, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+    p_partial.replace(p_journal)
+
+def delete_journal(playlist):
+    playlist_to_path(playlist).unlink(missing_ok=True)
+
+def start_journal(name, playlist, adds, removes) -> WriteJournal:
+    journal: WriteJournal = {
+        'name': name,
+        'playlistId': playlist['playlistId'],
+        'adds': [t['videoId'] for t in adds],
+        'removes': [
+            {'videoId': t['videoId'], 'setVideoId': t['setVideoId']}
+            for t in removes
+        ],
+        'added': 0,
+        'removed': 0,
+    }
+    write_journal(journal)
+    return journal
@@ -0,0 +1,83 @@
+import logging
+import argparse
+from typing import Optional
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from ytmb.utils import get_config, is_ok_filename
+import ytmb.authentication as auth
+import ytmb.playlists as pl
+import ytmb.track_index as ti
+from ytmb.snapshot import Snapshot, write_snapshot, name_to_path
+
+
+def fetch_library(name) -> list[tuple[pl.Playlist, list[pl.PlaylistItem]]]:
+    playlists = pl.get_playlists(name)
+    max_workers = get_config()['track_index']['max_workers']
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        all_tracks = list(executor.map(
+            lambda p: pl.get_tracks(name, p),
+            playlists,
+        ))
+    logging.debug(f"Fetched {len(playlists)} playlists for {name}")
+    return list(zip(playlists, all_tracks))
+
+def export_library(snapshot_name, names: Optional[list[str]]=None) -> Path:
+    """raises ValueError"""
+    if not is_ok_filename(snapshot_name):
+        raise ValueError("Bad name")
+    libraries = {
+        name: fetch_library(name) for name in names or auth.get_header_names()
+    }
+    p_snapshot = name_to_path(snapshot_name)
+    write_snapshot(p_snapshot, libraries)
+    return p_snapshot
+
+def import_library(snapshot_name, names: Optional[list[str]]=None) -> int:
+    """raises ValueError, KeyError"""
+    snapshot = Snapshot.load(snapshot_name)
+    num_imported = 0
+    for name in names or snapshot.names():
+        cache = {}
+        for playlist in snapshot.get_playlists(name):
+            tracks = snapshot.get_playlist(name, playlist['playlistId'])
+            cache[playlist['playlistId']] = {
+                'title': playlist['title'],
+                'fingerprint': pl.playlist_fingerprint(playlist),
+                'tracks': [
+                    [t['videoId'], t['title'], ti.format_artists(t)]
+                    for t in tracks['tracks'] if t.get('videoId')
+                ],
+            }
+        ti.write_track_cache(name, cache)
+        num_imported += len(cache)
+    return num_imported
+
+def export_main(argv=None):
+    parser = argparse.ArgumentParser(prog='ytmb export')
+    parser.add_argument('snapshot')
+    parser.add_argument('--user', action='append', dest='names')
+    args = parser.parse_args(argv)
+
+    try:
+        p_snapshot = export_library(args.snapshot, args.names)
+    except ValueError:
+        print("Bad snapshot name.")
+        return 1
+    print(f"Exported to {p_snapshot}")
+
+def import_main(argv=None):
+    parser = argparse.ArgumentParser(prog='ytmb import')
+    parser.add_argument('snapshot')
+    parser.add_argument('--user', action='append', dest='names')
+    args = parser.parse_args(argv)
+
+    try:
+        num_imported = import_library(args.snapshot, args.names)
+    except ValueError:
+        print("Snapshot not found.")
+        return 1
+    except KeyError as e:
+        print(f"User {e} not in snapshot.")
+        return 1
+    print(f"Imported {num_imported} playlists into the library index.")
@@ -0,0 +1,92 @@
+import logging
+from functools import cache
+from collections.abc import Sized, Iterable
+import json
+
+from ytmb.utils import get_config
+
+
+class Lazy:
+    def __init__(self, func, *args, **kwargs) -> None:
+        self.__func = func
+        self.__args = args
+        self.__kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.__func(*self.__args, **self.__kwargs))
+
+@cache
+def get_truncate_items() -> int:
+    return get_config()['logging']['truncate_items']
+
+class Truncated:
+    def __init__(self, value, limit=None, sep=', ', key=None) -> None:
+        self.value = value
+        self.__limit = limit
+        self.sep = sep
+        self.key = key or repr
+
+    @property
+    def limit(self) -> int:
+        return self.__limit or get_truncate_items()
+
+    def __str__(self) -> str:
+        match self.value:
+            case str() | bytes() | dict():
+                text = repr(self.value)
+                max_chars = 40 * self.limit
+                if len(text) <= max_chars:
+                    return text
+                return f"{text[:max_chars]}... ({len(text)} chars)"
+            case Sized() if isinstance(self.value, Iterable):
+                shown = [
+                    self.key(v) for _, v in zip(range(self.limit), self.value)
+                ]
+                hidden = len(self.value) - len(shown)
+                if hidden > 0:
+                    shown.append(f"... ({hidden} more)")
+                return self.sep.join(shown)
+            case _:
+                return repr(self.value)
+
+    def __json__(self):
+        match self.value:
+            case list() | tuple():
+                return list(self.value[:self.limit])
+            case str() if len(self.value) <= 40 * self.limit:
+                return self.value
+            case int() | float() | bool() | None:
+                return self.value
+            case _:
+                return str(self)
+
+def log_fields(level, msg, **fields):
+    if not logging.getLogger().isEnabledFor(level):
+        return
+    text = ' '.join(f"{k}={Truncated(v)}" for k, v in fields.items())
+    logging.log(
+        level,
+        f"{msg} {text}" if text else msg,
+        extra={'fields': fields},
+        stacklevel=2,
+    )
+
+def _to_json(value):
+    if isinstance(value, Truncated):
+        return value.__json__()
+    return str(value)
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'module': record.module,
+            'func': record.funcName,
+            'message': record.getMessage(),
+        }
+        for k, v in getattr(record, 'fields', {}).items():
+            entry[k] = Truncated(v)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=_to_json)
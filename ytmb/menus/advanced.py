@@ -1,7 +1,7 @@
 import logging
 import warnings
 from enum import StrEnum
-from typing import TypedDict
+from typing import TypedDict, Optional
 
 from ytmb.ui import (
     create_name_selector,
@@ -56,7 +56,7 @@ def advanced_args() -> AdvancedParameters:
     if not target_playlist:
         playlist_selector = create_playlist_selector(name)
         target_playlist = playlist_selector.user_choose()
-    if len(pl.get_tracks(name, target_playlist)) > 0:
+    if not pl.is_empty(name, target_playlist):
         match input("Target playlist not empty. Continue? (y/[n]) "):
             case 'y':
                 pass
@@ -118,14 +118,19 @@ def advanced_args() -> AdvancedParameters:
     return args
 
 def process_advanced(args: AdvancedParameters):
+    target_playlist = {'playlistId': args['target_playlist']}
+    pl.resume_pending_write(args['name'], target_playlist)
     logging.info("Combining tracks")
     tracks = pl.combine_tracks(
-        [
-            pl.get_tracks(
-                args['name'],
-                pl.deserialize_playlist(args['name'], p),
-            ) for p in args['source_playlists']
-        ],
+        pl.get_planned_tracks(
+            args['name'],
+            [
+                pl.deserialize_playlist(args['name'], p)
+                for p in args['source_playlists']
+            ],
+            args['sample_size'],
+            args['sample_method'],
+        ),
         args['sample_size'],
         args['sample_method'],
         args['combination_method'],
@@ -149,6 +154,19 @@ def process_advanced(args: AdvancedParameters):
             warnings.warn(f"Write method {args['write_method']} not "
                           "recognized. Target playlist not edited.")
 
+def advanced_fingerprint(args: AdvancedParameters) -> Optional[str]:
+    if (args['sample_method'] == pl.SampleMethod.RANDOM
+            or args['combination_method'] in {
+                pl.CombinationMethod.SHUFFLED,
+                pl.CombinationMethod.SPREAD,
+            }):
+        return None
+    return pl.get_inputs_fingerprint(
+        args['name'],
+        [*args['source_playlists'], args['target_playlist']],
+        args,
+    )
+
 def advanced_flow():
     try:
         args = advanced_args()
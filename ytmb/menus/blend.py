@@ -1,13 +1,18 @@
-from typing import TypedDict, NotRequired
+import logging
+from typing import TypedDict, NotRequired, Optional
+from itertools import combinations
 
 from ytmb.utils import get_config, write_config
 from ytmb.ui import (
     create_name_selector,
     create_playlist_selector,
     get_create_playlist_kwargs,
+    Selector,
+    Choice,
 )
-from ytmb.exploration import create_blend
+from ytmb.exploration import Playlist, HomePool, create_blend, create_blends
 import ytmb.playlists as pl
+import ytmb.analysis as an
 
 
 class BlendParameters(TypedDict):
@@ -15,10 +20,20 @@ class BlendParameters(TypedDict):
     source_users: list[str]
     target_playlist: str
     length: NotRequired[int]
+    taste_weighted: NotRequired[bool]
+    rotation: NotRequired[float]
 
-def blend_args() -> BlendParameters:
-    """throws ValueError"""
-    name_selector = create_name_selector()
+class TargetBlend(TypedDict):
+    source_users: list[str]
+    target_playlist: str
+
+class MultiBlendParameters(TypedDict):
+    name: str
+    blends: list[TargetBlend]
+    length: NotRequired[int]
+    rotation: NotRequired[float]
+
+def choose_source_users(name_selector) -> list[str]:
     source_users = []
     print("Adding source users.")
     while True:
@@ -30,8 +45,10 @@ def blend_args() -> BlendParameters:
             print("Please enter 'y' or 'n'.")
         if add_another == 'n':
             break
-    print("Choosing target playlist.")
-    name = name_selector.user_choose()
+    return source_users
+
+def choose_target_playlist(name) -> Playlist:
+    """throws ValueError"""
     target_playlist = None
     prompt = "Create new playlist? (y/n) "
     while (create_new := input(prompt)) not in {'y', 'n'}:
@@ -44,13 +61,63 @@ def blend_args() -> BlendParameters:
     if not target_playlist:
         playlist_selector = create_playlist_selector(name)
         target_playlist = playlist_selector.user_choose()
-    if len(pl.get_tracks(name, target_playlist)) > 0:
+    if not pl.is_empty(name, target_playlist):
         match input("Target playlist not empty. Continue? (y/[n]) "):
             case 'y':
                 pass
             case _:
                 raise ValueError("Non-empty target playlist")
     print(f"Target playlist: {target_playlist['title']}")
+    return target_playlist
+
+def ask_blend_length() -> Optional[int]:
+    if not get_config()['blend']['ask_for_length']:
+        return None
+    match input("Enter blend length? ([y]/n) "):
+        case 'n':
+            match input("Ask for blend length next time? ([y]/n) "):
+                case 'n':
+                    config = get_config()
+                    config['blend']['ask_for_length'] = False
+                    write_config(config)
+                case _:
+                    pass
+            return None
+        case _:
+            while True:
+                try:
+                    blend_length = int(input("Input a blend length: "))
+                    if blend_length < 0:
+                        print("Please input a positive number.")
+                        continue
+                    return blend_length
+                except ValueError:
+                    print("Please input a valid number.")
+                    continue
+
+def ask_rotation() -> Optional[float]:
+    match input("Rotate part of the blend on each run? (y/[n]) "):
+        case 'y':
+            while True:
+                try:
+                    percent = float(input("Percent of tracks to rotate: "))
+                    if not 0 < percent <= 100:
+                        print("Please input a number from 0 to 100.")
+                        continue
+                    return percent / 100
+                except ValueError:
+                    print("Please input a valid number.")
+                    continue
+        case _:
+            return None
+
+def blend_args() -> BlendParameters:
+    """throws ValueError"""
+    name_selector = create_name_selector()
+    source_users = choose_source_users(name_selector)
+    print("Choosing target playlist.")
+    name = name_selector.user_choose()
+    target_playlist = choose_target_playlist(name)
 
     args: BlendParameters = {
         'name': name,
@@ -58,37 +125,106 @@ def blend_args() -> BlendParameters:
         'target_playlist': pl.serialize_playlist(target_playlist),
     }
 
-    if get_config()['blend']['ask_for_length']:
-        match input("Enter blend length? ([y]/n) "):
-            case 'n':
-                match input("Ask for blend length next time? ([y]/n) "):
-                    case 'n':
-                        config = get_config()
-                        config['blend']['ask_for_length'] = False
-                        write_config(config)
-                    case _:
-                        pass
-            case _:
-                while True:
-                    try:
-                        blend_length = int(input("Input a blend length: "))
-                        if blend_length < 0:
-                            print("Please input a positive number.")
-                            continue
-                        break
-                    except ValueError:
-                        print("Please input a valid number.")
-                        continue
-                args['length'] = blend_length
+    if (blend_length := ask_blend_length()) is not None:
+        args['length'] = blend_length
+
+    if len(source_users) > 1:
+        prompt = "Weight users by taste match? (y/[n]) "
+        if input(prompt) == 'y':
+            args['taste_weighted'] = True
+
+    if (rotation := ask_rotation()) is not None:
+        args['rotation'] = rotation
 
     return args
 
 def process_blend(args: BlendParameters):
+    pools = {}
+    weights = None
+    if args.get('taste_weighted'):
+        pools = {user: HomePool(user) for user in args['source_users']}
+        try:
+            weights = an.taste_weights(args['source_users'], pools)
+        except ImportError as e:
+            logging.warning(f"Blending with equal shares: {e}")
     create_blend(
         args['name'],
         args['source_users'],
         pl.deserialize_playlist(args['name'], args['target_playlist']),
         args.get('length', get_config()['blend']['default_length']),
+        pools,
+        weights=weights,
+        rotation=args.get('rotation'),
+    )
+
+def multi_blend_args() -> MultiBlendParameters:
+    """throws ValueError"""
+    name_selector = create_name_selector()
+    source_users = choose_source_users(name_selector)
+    print("Choosing owner of the target playlists.")
+    name = name_selector.user_choose()
+    pairwise = Selector(
+        {
+            '1': Choice(True, "Every pair of users"),
+            '2': Choice(False, "Custom groups"),
+        },
+        prompt="Choose which blends to create: ",
+    ).user_choose()
+    blends: list[TargetBlend] = []
+    if pairwise:
+        for group in combinations(source_users, 2):
+            print(f"Choosing target playlist for {' + '.join(group)}.")
+            target_playlist = choose_target_playlist(name)
+            blends.append({
+                'source_users': list(group),
+                'target_playlist': pl.serialize_playlist(target_playlist),
+            })
+    else:
+        group_selector = Selector(
+            {str(i+1): Choice(n, n) for i, n in enumerate(source_users)},
+            prompt="Choose a name: ",
+            redo="Please choose a name by its number.",
+        )
+        while True:
+            print("Adding users to blend.")
+            group = choose_source_users(group_selector)
+            print("Choosing target playlist.")
+            target_playlist = choose_target_playlist(name)
+            blends.append({
+                'source_users': group,
+                'target_playlist': pl.serialize_playlist(target_playlist),
+            })
+            prompt = "Add another blend? (y/n) "
+            while (add_another := input(prompt)) not in {'y', 'n'}:
+                print("Please enter 'y' or 'n'.")
+            if add_another == 'n':
+                break
+
+    args: MultiBlendParameters = {
+        'name': name,
+        'blends': blends,
+    }
+
+    if (blend_length := ask_blend_length()) is not None:
+        args['length'] = blend_length
+
+    if (rotation := ask_rotation()) is not None:
+        args['rotation'] = rotation
+
+    return args
+
+def process_multi_blend(args: MultiBlendParameters):
+    create_blends(
+        args['name'],
+        [
+            (
+                b['source_users'],
+                pl.deserialize_playlist(args['name'], b['target_playlist']),
+            )
+            for b in args['blends']
+        ],
+        args.get('length', get_config()['blend']['default_length']),
+        args.get('rotation'),
     )
 
 def blend_flow():
@@ -99,3 +235,12 @@ def blend_flow():
         return
     process_blend(args)
     print("Done.")
+
+def multi_blend_flow():
+    try:
+        args = multi_blend_args()
+    except ValueError:
+        print("No blends created.")
+        return
+    process_multi_blend(args)
+    print("Done.")
@@ -1,5 +1,5 @@
 import logging
-from typing import TypedDict
+from typing import TypedDict, NotRequired, Optional
 
 from ytmb.ui import (
     create_name_selector,
@@ -7,12 +7,14 @@ from ytmb.ui import (
     get_create_playlist_kwargs,
 )
 import ytmb.playlists as pl
+from ytmb.logs import Truncated
 
 
 class CompilationParameters(TypedDict):
     name: str
     source_playlists: list[str]
     target_playlist: str
+    dedupe: NotRequired[bool]
 
 def compilation_args() -> CompilationParameters:
     """throws ValueError"""
@@ -44,7 +46,7 @@ def compilation_args() -> CompilationParameters:
     if not target_playlist:
         playlist_selector = create_playlist_selector(name)
         target_playlist = playlist_selector.user_choose()
-    if len(pl.get_tracks(name, target_playlist)) > 0:
+    if not pl.is_empty(name, target_playlist):
         match input("Target playlist not empty. Continue? (y/[n]) "):
             case 'y':
                 pass
@@ -59,36 +61,68 @@ def compilation_args() -> CompilationParameters:
         ],
         'target_playlist': pl.serialize_playlist(target_playlist),
     }
+
+    prompt = "Remove near-duplicate tracks? (y/[n]) "
+    if input(prompt) == 'y':
+        args['dedupe'] = True
+
     return args
 
 def process_compilation(args: CompilationParameters):
+    target_playlist = {'playlistId': args['target_playlist']}
+    pl.resume_pending_write(args['name'], target_playlist)
     logging.info("Getting tracks")
     source_tracks = [
-        pl.get_tracks(args['name'], pl.deserialize_playlist(args['name'], p))
+        pl.get_source_tracks(
+            args['name'],
+            pl.deserialize_playlist(args['name'], p),
+        )
         for p in args['source_playlists']
     ]
-    flat_source_tracks = [t for p in source_tracks for t in p]
     target_tracks = pl.get_tracks(
         args['name'],
         pl.deserialize_playlist(args['name'], args['target_playlist']),
     )
-    tracks_to_add = pl.tracks_difference(flat_source_tracks, target_tracks)
-    tracks_to_remove = pl.tracks_difference(target_tracks, flat_source_tracks)
-    add_names = '\n\t'.join(t['title'] for t in tracks_to_add)
-    remove_names = '\n\t'.join(t['title'] for t in tracks_to_remove)
-    logging.info(f"Tracks to add:\n\t{add_names}")
-    logging.info(f"Tracks to remove:\n\t{remove_names}")
-    logging.info("Updating playlist")
+    dedupe = args.get('dedupe', False)
     combined_tracks = pl.combine_tracks(
         source_tracks,
         pl.SampleLimit.ALL,
         pl.SampleMethod.IN_ORDER,
         pl.CombinationMethod.CONCATENATED,
+        dedupe,
     )
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        tracks_to_add = pl.tracks_difference(
+            combined_tracks,
+            target_tracks,
+            dedupe,
+        )
+        tracks_to_remove = pl.tracks_difference(
+            target_tracks,
+            combined_tracks,
+            dedupe,
+        )
+        logging.info(
+            "Tracks to add:\n\t%s",
+            Truncated(tracks_to_add, sep='\n\t', key=lambda t: t['title']),
+        )
+        logging.info(
+            "Tracks to remove:\n\t%s",
+            Truncated(tracks_to_remove, sep='\n\t', key=lambda t: t['title']),
+        )
+    logging.info("Updating playlist")
     pl.update_playlist(
         args['name'],
         pl.deserialize_playlist(args['name'], args['target_playlist']),
         combined_tracks,
+        dedupe,
+    )
+
+def compilation_fingerprint(args: CompilationParameters) -> Optional[str]:
+    return pl.get_inputs_fingerprint(
+        args['name'],
+        [*args['source_playlists'], args['target_playlist']],
+        args,
     )
 
 def compilation_flow():
@@ -43,7 +43,7 @@ def mixtape_args() -> MixtapeParameters:
     if not target_playlist:
         playlist_selector = create_playlist_selector(name)
         target_playlist = playlist_selector.user_choose()
-    if len(pl.get_tracks(name, target_playlist)) > 0:
+    if not pl.is_empty(name, target_playlist):
         match input("Target playlist not empty. Continue? (y/[n]) "):
             case 'y':
                 pass
@@ -61,6 +61,8 @@ def mixtape_args() -> MixtapeParameters:
     return args
 
 def process_mixtape(args: MixtapeParameters):
+    target_playlist = {'playlistId': args['target_playlist']}
+    pl.resume_pending_write(args['name'], target_playlist)
     pl.combine_playlists(
         args['name'],
         [
@@ -1,6 +1,7 @@
 from ytmb.ui import Actor, Action, Selector, Choice
 from ytmb.automation import (
     AUTOMATABLES,
+    COMMAND_NAMES,
     Routine,
     get_routines,
     add_routine,
@@ -8,6 +9,28 @@ from ytmb.automation import (
 )
 
 
+def choose_dependencies(name) -> list[str]:
+    others = [n for n in get_routines() if n != name]
+    depends_on = []
+    if not others:
+        return depends_on
+    prompt = "Run after other routines when chained? (y/[n]) "
+    if input(prompt) != 'y':
+        return depends_on
+    routines_selector = Selector(
+        {str(i+1): Choice(n, n) for i, n in enumerate(others)}
+    )
+    while True:
+        dependency = routines_selector.user_choose()
+        if dependency not in depends_on:
+            depends_on.append(dependency)
+        print(f"Runs after: {', '.join(depends_on)}")
+        prompt = "Add another routine? (y/n) "
+        while (add_another := input(prompt)) not in {'y', 'n'}:
+            print("Please enter 'y' or 'n'.")
+        if add_another == 'n':
+            return depends_on
+
 def create_routine():
     program_selector = Selector({
         str(i+1): Choice((n, a), n) for i, (n, a)
@@ -26,6 +49,9 @@ def create_routine():
         if not name:
             print("Name cannot be blank.")
             continue
+        elif name in COMMAND_NAMES:
+            print(f"{name} is the name of a command. Please choose another.")
+            continue
         else:
             break
 
@@ -36,6 +62,10 @@ def create_routine():
         'desc': desc,
         'args': args,
     }
+
+    if depends_on := choose_dependencies(name):
+        routine['depends_on'] = depends_on
+
     add_routine(name, routine)
     print("Done.")
 
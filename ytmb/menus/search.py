@@ -0,0 +1,29 @@
+from ytmb.ui import Actor, Action
+import ytmb.authentication as auth
+import ytmb.track_index as ti
+
+
+def refresh_track_index():
+    for name in auth.get_header_names():
+        print(f"Refreshing {name}'s library.")
+        num_refreshed = ti.update_track_cache(name)
+        print(f"{num_refreshed} playlists updated.")
+    print("Done.")
+
+def search_tracks():
+    index = ti.load_track_index()
+    query = input("Enter a title, artist, or video ID: ")
+    hits = index.find_video(query) or index.find(query)
+    if not hits:
+        print("No matching tracks found.")
+        return
+    for hit in hits:
+        print(f"{hit.title} - {hit.artists}: "
+              f"{hit.location.user}/{hit.location.playlist_title}")
+
+def search_menu():
+    actor = Actor({
+        '1': Action(search_tracks, "Search for a track"),
+        '2': Action(refresh_track_index, "Refresh library index"),
+    })
+    actor.user_execute()
@@ -1,10 +1,25 @@
-from typing import TypedDict
+import logging
+from typing import TypedDict, Optional
 from pathlib import Path
 from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+import json
 
-from ytmb.ui import create_name_selector, create_playlist_selector
+from ytmb.ui import (
+    create_name_selector,
+    create_playlist_selector,
+    Selector,
+    Choice,
+)
+import ytmb.authentication as auth
 import ytmb.playlists as pl
-from ytmb.utils import get_config, get_data_directory
+import ytmb.history as history
+from ytmb.utils import (
+    global_settings,
+    get_config,
+    get_data_directory,
+    parse_count,
+)
 from ytmb.exploration import Playlist
 
 
@@ -12,6 +27,9 @@ class TrackingParameters(TypedDict):
     name: str
     playlist: str
 
+class BulkTrackingParameters(TypedDict):
+    names: Optional[list[str]]
+
 def get_audits_directory(name: str, playlist: Playlist) -> Path:
     p_all_audits = get_data_directory(get_config()['tracking']['audits_path'])
     p_audits = p_all_audits / name / playlist['title']
@@ -19,6 +37,40 @@ def get_audits_directory(name: str, playlist: Playlist) -> Path:
         p_audits.mkdir(parents=True)
     return p_audits
 
+def get_fingerprints_path(name: str) -> Path:
+    p_all_audits = get_data_directory(get_config()['tracking']['audits_path'])
+    return p_all_audits / name / 'fingerprints.json'
+
+def get_fingerprints(name: str) -> dict[str, str]:
+    p_fingerprints = get_fingerprints_path(name)
+    if not p_fingerprints.is_file():
+        return {}
+    with open(p_fingerprints, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_fingerprints(name: str, fingerprints: dict[str, str]):
+    p_fingerprints = get_fingerprints_path(name)
+    p_fingerprints.parent.mkdir(parents=True, exist_ok=True)
+    with open(p_fingerprints, 'w', encoding='utf-8') as f:
+        json.dump(fingerprints, f, indent=4)
+
+def write_audit(
+        name: str,
+        playlist: Playlist,
+        tracks,
+        audit_date: date,
+) -> list:
+    p_playlist_audits = get_audits_directory(name, playlist)
+    audit_name = audit_date.strftime('%y-%m-%d.txt')
+    written_tracks = []
+    with open(p_playlist_audits / audit_name, 'w', encoding='utf-8') as f:
+        for track in tracks:
+            f.write(track['title'] + '\n')
+            written_tracks.append(
+                {'videoId': track.get('videoId'), 'title': track['title']}
+            )
+    return written_tracks
+
 def tracking_args() -> TrackingParameters:
     name_selector = create_name_selector()
     name = name_selector.user_choose()
@@ -33,27 +85,82 @@ def tracking_args() -> TrackingParameters:
     return args
 
 def process_tracking(args: TrackingParameters):
-    # HACK
-
-    # TODO: Make process more structured/automated
-
-    p_playlist_audits = get_audits_directory(
+    playlist = pl.deserialize_playlist(args['name'], args['playlist'])
+    audit_date = date.today()
+    tracks = write_audit(
         args['name'],
-        pl.deserialize_playlist(args['name'], args['playlist'])
+        playlist,
+        pl.iter_tracks(args['name'], playlist),
+        audit_date,
     )
-    audit_name = date.today().strftime('%y-%m-%d.txt')
+    con = history.connect()
+    history.record_snapshot(con, args['name'], playlist, tracks, audit_date)
+    con.close()
 
-    with open(p_playlist_audits / audit_name, 'w', encoding='utf-8') as f:
-        f.writelines(
-            t['title'] + '\n' for t in pl.get_tracks(
-                args['name'],
-                pl.deserialize_playlist(args['name'], args['playlist'])
-            )
-        )
+def bulk_tracking_args() -> BulkTrackingParameters:
+    all_users = Selector(
+        {
+            '1': Choice(True, "All signed-in users"),
+            '2': Choice(False, "One user"),
+        },
+        prompt="Choose whose playlists to track: ",
+    ).user_choose()
+    names = None if all_users else [create_name_selector().user_choose()]
+
+    args: BulkTrackingParameters = {
+        'names': names,
+    }
+    return args
 
-    # end HACK
+def get_changed_playlists(
+        names,
+        fingerprints: dict[str, dict[str, str]],
+        force=False,
+) -> list[tuple[str, Playlist, str]]:
+    jobs = []
+    for name in names:
+        for playlist in pl.get_playlists(name):
+            fingerprint = pl.playlist_fingerprint(playlist)
+            previous = fingerprints[name].get(playlist['playlistId'])
+            if previous == fingerprint and not force:
+                logging.debug("Skipping unchanged %s", playlist['title'])
+                continue
+            jobs.append((name, playlist, fingerprint))
+    return jobs
+
+def process_bulk_tracking(args: BulkTrackingParameters):
+    names = args['names'] or auth.get_header_names()
+    fingerprints = {name: get_fingerprints(name) for name in names}
+    jobs = get_changed_playlists(names, fingerprints, global_settings['force'])
+    logging.info(f"Getting tracks for {len(jobs)} changed playlists")
+
+    max_workers = get_config()['tracking']['max_workers']
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        all_tracks = list(executor.map(
+            lambda job: pl.get_tracks(job[0], job[1]),
+            jobs,
+        ))
+
+    logging.info("Writing audits")
+    audit_date = date.today()
+    con = history.connect()
+    for (name, playlist, fingerprint), tracks in zip(jobs, all_tracks):
+        if not tracks and parse_count(playlist.get('count')):
+            logging.warning(f"No tracks found for {playlist['title']}")
+            continue
+        write_audit(name, playlist, tracks, audit_date)
+        history.record_snapshot(con, name, playlist, tracks, audit_date)
+        fingerprints[name][playlist['playlistId']] = fingerprint
+    con.close()
+    for name in names:
+        write_fingerprints(name, fingerprints[name])
 
 def tracking_flow():
     args = tracking_args()
     process_tracking(args)
     print("Done.")
+
+def bulk_tracking_flow():
+    args = bulk_tracking_args()
+    process_bulk_tracking(args)
+    print("Done.")
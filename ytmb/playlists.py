@@ -1,12 +1,41 @@
 import logging
 from typing import NotRequired, Optional
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from enum import StrEnum
 import random
-from itertools import zip_longest, chain
+import hashlib
+import json
+from itertools import zip_longest, chain, islice
+from threading import Lock
+from contextlib import contextmanager
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from ytmusicapi import YTMusic
+    from ytmusicapi.continuations import (
+        CONTINUATION_ITEMS,
+        get_continuation_token,
+    )
+    from ytmusicapi.navigation import (
+        nav,
+        TWO_COLUMN_RENDERER,
+        SECTION,
+        CONTENT,
+    )
+    from ytmusicapi.parsers.playlists import parse_playlist_items
+except ImportError:
+    parse_playlist_items = None
+
+from ytmb.utils import get_config, parse_count
 import ytmb.authentication as auth
+import ytmb.journal as jr
+import ytmb.transformations as tf
 from ytmb.exploration import Playlist, Track
+from ytmb.logs import Truncated, log_fields
 
 
 class PlaylistItem(Track):
@@ -41,6 +70,7 @@ class CombinationMethod(StrEnum):
     INTERLEAVED = 'interleaved'
     CONCATENATED = 'concatenated'
     SHUFFLED = 'shuffled'
+    SPREAD = 'spread'
 
 def get_playlists(name) -> list[Playlist]:
     try:
@@ -49,6 +79,15 @@ def get_playlists(name) -> list[Playlist]:
         logging.error(f"Could not get user playlists:\n{repr(e)}")
         return []
 
+def playlist_fingerprint(playlist: Playlist) -> str:
+    metadata = [
+        playlist['playlistId'],
+        playlist['title'],
+        parse_count(playlist.get('count')),
+        [t.get('url') for t in playlist.get('thumbnails', [])],
+    ]
+    return hashlib.sha1(json.dumps(metadata).encode()).hexdigest()
+
 def serialize_playlist(playlist: Playlist) -> str:
     return playlist['playlistId']
 
@@ -60,6 +99,10 @@ def deserialize_playlist(name, str_playlist) -> Playlist:
         'thumbnails': info.get('thumbnails', []),
         'description': info['description'],
     }
+    if info.get('trackCount') is not None:
+        playlist['count'] = info['trackCount']
+    if (handoff := get_handoff(playlist)) is not None:
+        playlist['count'] = len(handoff)
     return playlist
 
 def create_playlist(
@@ -71,25 +114,148 @@ def create_playlist(
     privacy_status = PrivacyStatus(privacy_status)
     resp = (auth.get_client(name)
                 .create_playlist(title, description, privacy_status.value))
-    logging.debug(f"{resp=}")
+    logging.debug("resp=%s", Truncated(resp))
     if isinstance(resp, str):
         return deserialize_playlist(name, resp)
     logging.error("Failed to create playlist.")
     return None
 
-def get_tracks(name, playlist) -> list[PlaylistItem]:
+def get_tracks(name, playlist, limit=None) -> list[PlaylistItem]:
     try:
         return (auth.get_client(name)
-                    .get_playlist(playlist['playlistId'], limit=None)
-                    .get('tracks', []))
+                    .get_playlist(playlist['playlistId'], limit=limit)
+                    .get('tracks', []))[:limit]
     except Exception as e:
         logging.error(f"Could not get playlist tracks:\n{repr(e)}")
         return []
 
+def _browse_track_pages(client, playlistId) -> Iterator[list[PlaylistItem]]:
+    """raises KeyError, TypeError"""
+    browseId = playlistId if playlistId.startswith('VL') else f'VL{playlistId}'
+    response = client._send_request('browse', {'browseId': browseId})
+    section_list = nav(
+        response,
+        [*TWO_COLUMN_RENDERER, 'secondaryContents', *SECTION],
+    )
+    shelf = nav(section_list, [*CONTENT, 'musicPlaylistShelfRenderer'])
+    contents = shelf.get('contents')
+    while contents:
+        page = parse_playlist_items(contents)
+        if not page:
+            return
+        yield page
+        if not (token := get_continuation_token(contents)):
+            return
+        response = client._send_request('browse', {'continuation': token})
+        contents = nav(response, CONTINUATION_ITEMS, True)
+
+def iter_track_pages(name, playlist) -> Iterator[list[PlaylistItem]]:
+    client = auth.get_client(name)
+    streamable = (parse_playlist_items is not None
+                  and isinstance(client, YTMusic)
+                  and not playlist['playlistId'].startswith(('OLA', 'VLOLA')))
+    if not streamable:
+        yield get_tracks(name, playlist)
+        return
+    pages = _browse_track_pages(client, playlist['playlistId'])
+    num_received = 0
+    try:
+        for page in pages:
+            num_received += len(page)
+            yield page
+    except Exception as e:
+        logging.error(f"Could not get playlist tracks:\n{repr(e)}")
+        if not num_received:
+            yield get_tracks(name, playlist)
+
+def iter_tracks(name, playlist) -> Iterator[PlaylistItem]:
+    return chain.from_iterable(iter_track_pages(name, playlist))
+
+_handoffs: Optional[dict[str, list[PlaylistItem]]] = None
+_handoffs_lock = Lock()
+
+@contextmanager
+def handoff_scope():
+    global _handoffs
+    _handoffs = {}
+    try:
+        yield
+    finally:
+        _handoffs = None
+
+def hand_off(playlist, tracks: Optional[list]):
+    with _handoffs_lock:
+        if _handoffs is None:
+            return
+        if tracks is None:
+            _handoffs.pop(playlist['playlistId'], None)
+        else:
+            _handoffs[playlist['playlistId']] = list(tracks)
+
+def get_handoff(playlist) -> Optional[list[PlaylistItem]]:
+    with _handoffs_lock:
+        if _handoffs is None:
+            return None
+        return _handoffs.get(playlist['playlistId'])
+
+def get_source_tracks(name, playlist, limit=None) -> list[PlaylistItem]:
+    if (tracks := get_handoff(playlist)) is not None:
+        logging.debug(f"Reusing {len(tracks)} tracks of {playlist['title']}")
+        return tracks[:limit]
+    tracks = get_tracks(name, playlist, limit)
+    if tracks and limit is None:
+        hand_off(playlist, tracks)
+    return tracks
+
+def get_track_count(name, playlist) -> Optional[int]:
+    if (count := parse_count(playlist.get('count'))) is not None:
+        return count
+    try:
+        return (auth.get_client(name)
+                    .get_playlist(playlist['playlistId'], limit=0)
+                    .get('trackCount'))
+    except Exception as e:
+        logging.error(f"Could not get playlist track count:\n{repr(e)}")
+        return None
+
+def get_content_fingerprint(name, playlist) -> Optional[str]:
+    try:
+        info = (auth.get_client(name)
+                    .get_playlist(playlist['playlistId'], limit=0))
+    except Exception as e:
+        logging.error(f"Could not get playlist metadata:\n{repr(e)}")
+        return None
+    content = [
+        playlist['playlistId'],
+        info.get('trackCount'),
+        [t.get('videoId') for t in info.get('tracks', [])],
+    ]
+    return hashlib.sha1(json.dumps(content).encode()).hexdigest()
+
+def get_inputs_fingerprint(name, playlistIds, params) -> Optional[str]:
+    content_fingerprints = [
+        get_content_fingerprint(name, {'playlistId': p}) for p in playlistIds
+    ]
+    if None in content_fingerprints:
+        return None
+    inputs = json.dumps([params, content_fingerprints], sort_keys=True)
+    return hashlib.sha1(inputs.encode()).hexdigest()
+
+def is_empty(name, playlist) -> bool:
+    if (count := get_track_count(name, playlist)) is not None:
+        return count == 0
+    return len(get_tracks(name, playlist, limit=1)) == 0
+
 def add_tracks(name, playlist, tracks):
     if tracks:
+        hand_off(playlist, None)
         videoIds = [t['videoId'] for t in tracks]
-        logging.debug(f"{videoIds=}")
+        log_fields(
+            logging.DEBUG,
+            "Adding tracks",
+            playlistId=playlist['playlistId'],
+            videoIds=videoIds,
+        )
         resp = (
             auth.get_client(name)
                 .add_playlist_items(
@@ -98,57 +264,168 @@ def add_tracks(name, playlist, tracks):
                     duplicates=True,
                 )
         )
-        logging.debug(f"{resp=}")
+        logging.debug("resp=%s", Truncated(resp))
 
 def remove_tracks(name, playlist, tracks):
     if tracks:
+        hand_off(playlist, None)
         resp = (auth.get_client(name)
                     .remove_playlist_items(playlist['playlistId'], tracks))
-        logging.debug(f"{resp=}")
+        logging.debug("resp=%s", Truncated(resp))
 
 def clear_playlist(name, playlist):
     tracks = get_tracks(name, playlist)
     remove_tracks(name, playlist, tracks)
 
+def get_setVideoIds(name, playlist) -> list[str]:
+    tracks = (auth.get_client(name)
+                  .get_playlist(playlist['playlistId'], limit=None)
+                  .get('tracks', []))
+    return [t['setVideoId'] for t in tracks if t.get('setVideoId')]
+
+def reconcile_journal(name, playlist, journal: jr.WriteJournal):
+    chunk_size = get_config()['playlists']['write_chunk_size']
+    setVideoIds = get_setVideoIds(name, playlist)
+    if journal['added'] < len(journal['adds']):
+        chunk = journal['adds'][journal['added']:journal['added'] + chunk_size]
+        old_setVideoIds = set(journal.get('old_setVideoIds', setVideoIds))
+        num_new = sum(s not in old_setVideoIds for s in setVideoIds)
+        if num_new >= journal['added'] + len(chunk):
+            logging.info("Interrupted chunk of adds had already been sent")
+            journal['added'] += len(chunk)
+    else:
+        chunk = journal['removes'][
+            journal['removed']:journal['removed'] + chunk_size
+        ]
+        present = set(setVideoIds)
+        if not any(t['setVideoId'] in present for t in chunk):
+            logging.info("Interrupted chunk of removes had already been sent")
+            journal['removed'] += len(chunk)
+    journal['in_flight'] = False
+    jr.write_journal(journal)
+
+def run_journal(name, playlist, journal: jr.WriteJournal):
+    chunk_size = get_config()['playlists']['write_chunk_size']
+    if journal.get('in_flight'):
+        reconcile_journal(name, playlist, journal)
+    if (journal['added'] < len(journal['adds'])
+            and 'old_setVideoIds' not in journal):
+        journal['old_setVideoIds'] = get_setVideoIds(name, playlist)
+        jr.write_journal(journal)
+    while journal['added'] < len(journal['adds']):
+        chunk = journal['adds'][journal['added']:journal['added'] + chunk_size]
+        journal['in_flight'] = True
+        jr.write_journal(journal)
+        add_tracks(name, playlist, [{'videoId': v} for v in chunk])
+        journal['added'] += len(chunk)
+        journal['in_flight'] = False
+        jr.write_journal(journal)
+    while journal['removed'] < len(journal['removes']):
+        chunk = journal['removes'][
+            journal['removed']:journal['removed'] + chunk_size
+        ]
+        journal['in_flight'] = True
+        jr.write_journal(journal)
+        remove_tracks(name, playlist, chunk)
+        journal['removed'] += len(chunk)
+        journal['in_flight'] = False
+        jr.write_journal(journal)
+    jr.delete_journal(playlist)
+
+def write_playlist(name, playlist, tracks_to_add, tracks_to_remove):
+    journal = jr.start_journal(name, playlist, tracks_to_add, tracks_to_remove)
+    run_journal(name, playlist, journal)
+
+def resume_pending_write(name, playlist) -> bool:
+    journal = jr.get_journal(playlist)
+    if not journal:
+        return False
+    logging.info(
+        f"Resuming interrupted write: {journal['added']}/"
+        f"{len(journal['adds'])} tracks added, {journal['removed']}/"
+        f"{len(journal['removes'])} tracks removed"
+    )
+    run_journal(name, playlist, journal)
+    return True
+
 def overwrite_playlist(name, playlist, tracks):
+    resume_pending_write(name, playlist)
     old_tracks = get_tracks(name, playlist)
     logging.debug(f"Found {len(old_tracks)} tracks")
-    logging.debug(f"Adding {len(tracks)} tracks")
-    add_tracks(name, playlist, tracks)
-    logging.debug(f"Removing old tracks")
-    remove_tracks(name, playlist, old_tracks)
+    logging.debug(f"Adding {len(tracks)} tracks and removing old tracks")
+    write_playlist(name, playlist, tracks, old_tracks)
+    hand_off(playlist, tracks)
 
-def tracks_difference(minuend, subtrahend):
+def tracks_difference(minuend, subtrahend, dedupe=False):
+    if dedupe:
+        index = tf.DuplicateIndex()
+        for t in subtrahend:
+            index.add(t)
+        return [t for t in minuend if index.find(t) is None]
     subtrahend_videoId = {t['videoId'] for t in subtrahend}
     return [t for t in minuend if t['videoId'] not in subtrahend_videoId]
 
-def update_playlist(name, playlist, tracks):
+def update_playlist(name, playlist, tracks, dedupe=False):
+    resume_pending_write(name, playlist)
     existing_tracks = get_tracks(name, playlist)
     logging.debug(f"Found {len(existing_tracks)} tracks")
-    new_tracks = tracks_difference(tracks, existing_tracks)
+    new_tracks = tracks_difference(tracks, existing_tracks, dedupe)
     logging.debug(f"Adding {len(new_tracks)} new tracks")
-    add_tracks(name, playlist, new_tracks)
-    retired_tracks = tracks_difference(existing_tracks, tracks)
+    retired_tracks = tracks_difference(existing_tracks, tracks, dedupe)
     logging.debug(f"Removing {len(retired_tracks)} old tracks")
-    remove_tracks(name, playlist, retired_tracks)
+    write_playlist(name, playlist, new_tracks, retired_tracks)
+    hand_off(
+        playlist,
+        tracks_difference(existing_tracks, retired_tracks) + new_tracks,
+    )
 
-def combine_tracks(
-        tracks: Iterable[Iterable[Track]],
+def plan_limits(
+        name,
+        playlists,
         sample_size: SampleSize=SampleLimit.ALL,
         sample_method: SampleMethod=SampleMethod.IN_ORDER,
-        combination_method: CombinationMethod=CombinationMethod.CONCATENATED,
+) -> list[Optional[int]]:
+    if dedupe:
+        index = tf.DuplicateIndex()
+        tracks = [tf.iter_unique(t, index) for t in tracks]
+    match sample_size, sample_method:
+        case int(), SampleMethod.IN_ORDER:
+            return [sample_size] * len(playlists)
+        case SampleLimit.SHORTEST_PLAYLIST, SampleMethod.IN_ORDER:
+            counts = [get_track_count(name, p) for p in playlists]
+            if None in counts:
+                return [None] * len(playlists)
+            return [min(counts, default=None)] * len(playlists)
+        case _:
+            return [None] * len(playlists)
+
+def get_planned_tracks(
+        name,
+        playlists,
+        sample_size: SampleSize=SampleLimit.ALL,
+        sample_method: SampleMethod=SampleMethod.IN_ORDER,
+) -> list[list[PlaylistItem]]:
+    limits = plan_limits(name, playlists, sample_size, sample_method)
+    logging.debug(f"Planned track limits: {limits}")
+    return [
+        get_source_tracks(name, p, limit)
+        for p, limit in zip(playlists, limits)
+    ]
+
+def combine_lists(
+        tracks: list[list[Track]],
+        limit: Optional[int],
+        sample_method: SampleMethod,
+        combination_method: CombinationMethod,
 ) -> list[Track]:
-    match sample_size:
-        case SampleLimit.ALL:
-            limit = None
-        case SampleLimit.SHORTEST_PLAYLIST:
-            limit = min(map(len, tracks))
-        case int():
-            limit = sample_size
     match sample_method:
         case SampleMethod.RANDOM:
             sampled_tracks = [
-                random.sample(t, min(limit, len(t))) for t in tracks
+                random.sample(
+                    t,
+                    len(t) if limit is None else min(limit, len(t)),
+                )
+                for t in tracks
             ]
         case SampleMethod.IN_ORDER:
             sampled_tracks = [t[:limit] for t in tracks]
@@ -164,6 +441,106 @@ def combine_tracks(
         case CombinationMethod.SHUFFLED:
             combined_tracks = list(chain.from_iterable(sampled_tracks))
             random.shuffle(combined_tracks)
+        case CombinationMethod.SPREAD:
+            combined_tracks = tf.spread_shuffle(
+                chain.from_iterable(sampled_tracks)
+            )
+    return combined_tracks
+
+def combine_indices(
+        lengths: list[int],
+        limit: Optional[int],
+        sample_method: SampleMethod,
+        combination_method: CombinationMethod,
+        rng: 'np.random.Generator',
+) -> 'np.ndarray':
+    lengths = np.asarray(lengths, dtype=np.intp)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    sources = np.repeat(np.arange(len(lengths)), lengths)
+    ranks = np.arange(lengths.sum()) - offsets[sources]
+    if sample_method == SampleMethod.RANDOM:
+        order = np.argsort(sources + rng.random(len(sources)))
+        sources = sources[order]
+        ranks = np.arange(len(order)) - offsets[sources]
+    else:
+        order = np.arange(len(sources))
+    if limit is not None:
+        selected = ranks < limit
+        order = order[selected]
+        sources = sources[selected]
+        ranks = ranks[selected]
+    match combination_method:
+        case CombinationMethod.INTERLEAVED:
+            order = order[np.argsort(ranks * len(lengths) + sources)]
+        case CombinationMethod.SHUFFLED:
+            order = rng.permutation(order)
+    return order
+
+def combine_arrays(
+        tracks: list[list[Track]],
+        limit: Optional[int],
+        sample_method: SampleMethod,
+        combination_method: CombinationMethod,
+        rng: Optional['np.random.Generator']=None,
+) -> list[Track]:
+    rng = rng or np.random.default_rng(random.getrandbits(64))
+    lengths = [len(t) for t in tracks]
+    indices = combine_indices(
+        lengths,
+        limit,
+        sample_method,
+        combination_method,
+        rng,
+    )
+    flat_tracks = list(chain.from_iterable(tracks))
+    return [flat_tracks[i] for i in indices.tolist()]
+
+def combine_tracks(
+        tracks: Iterable[Iterable[Track]],
+        sample_size: SampleSize=SampleLimit.ALL,
+        sample_method: SampleMethod=SampleMethod.IN_ORDER,
+        combination_method: CombinationMethod=CombinationMethod.CONCATENATED,
+        dedupe=False,
+        rng: Optional['np.random.Generator']=None,
+) -> list[Track]:
+    if dedupe:
+        index = tf.DuplicateIndex()
+        tracks = [tf.iter_unique(t, index) for t in tracks]
+    match sample_size, sample_method:
+        case int(), SampleMethod.IN_ORDER:
+            tracks = [list(islice(t, sample_size)) for t in tracks]
+        case _:
+            tracks = [list(t) for t in tracks]
+    match sample_size:
+        case SampleLimit.ALL:
+            limit = None
+        case SampleLimit.SHORTEST_PLAYLIST:
+            limit = min(map(len, tracks))
+        case int():
+            limit = sample_size
+    randomized = (sample_method == SampleMethod.RANDOM
+                  or combination_method == CombinationMethod.SHUFFLED)
+    vectorize = (
+        np is not None
+        and combination_method != CombinationMethod.SPREAD
+        and (rng is not None or randomized and sum(map(len, tracks))
+             >= get_config()['playlists']['vectorize_threshold'])
+    )
+    if vectorize:
+        combined_tracks = combine_arrays(
+            tracks,
+            limit,
+            sample_method,
+            combination_method,
+            rng,
+        )
+    else:
+        combined_tracks = combine_lists(
+            tracks,
+            limit,
+            sample_method,
+            combination_method,
+        )
     return combined_tracks
 
 def combine_playlists(
@@ -175,12 +552,18 @@ def combine_playlists(
         combination_method: CombinationMethod=CombinationMethod.CONCATENATED,
 ):
     logging.info("Getting tracks")
-    tracks = [get_tracks(name, p) for p in source_playlists]
+    tracks = get_planned_tracks(
+        name,
+        source_playlists,
+        sample_size,
+        sample_method,
+    )
     logging.debug(
-        ", ".join(
-            f"{p['title']} -- {len(t)} tracks"
-            for p, t in zip(source_playlists, tracks)
-        )
+        "%s",
+        Truncated(
+            [(p['title'], len(t)) for p, t in zip(source_playlists, tracks)],
+            key=lambda pt: f"{pt[0]} -- {pt[1]} tracks",
+        ),
     )
     combined_tracks = combine_tracks(
         tracks,
@@ -0,0 +1,93 @@
+import logging
+from typing import Optional
+from pathlib import Path
+import json
+import time
+from threading import Lock
+
+from ytmb.utils import get_config, get_data_directory
+
+
+def get_recency_path() -> Path:
+    return get_data_directory(get_config()['blend']['recency']['recency_path'])
+
+def _decay(
+        entries: dict[str, float],
+        ttl,
+        max_size: Optional[int],
+        now,
+) -> dict[str, float]:
+    fresh = sorted(
+        ((k, t) for k, t in entries.items() if now - t < ttl),
+        key=lambda kt: kt[1],
+        reverse=True,
+    )
+    return dict(fresh[:max_size])
+
+def _merge(*entries: dict[str, float]) -> dict[str, float]:
+    merged = {}
+    for e in entries:
+        for k, t in e.items():
+            merged[k] = max(t, merged.get(k, t))
+    return merged
+
+recency_lock = Lock()
+
+class RecentTracks:
+    def __init__(self, name, tracks=None, listings=None) -> None:
+        config = get_config()['blend']['recency']
+        self.name = name
+        self.ttl = 24 * 60 * 60 * config['ttl_days']
+        self.max_size = config['max_size']
+        now = time.time()
+        self.tracks = _decay(tracks or {}, self.ttl, self.max_size, now)
+        self.listings = _decay(listings or {}, self.ttl, None, now)
+
+    @classmethod
+    def load(cls, name) -> 'RecentTracks':
+        p_recent = get_recency_path() / f'{name}.json'
+        if not p_recent.is_file():
+            return cls(name)
+        with open(p_recent, encoding='utf-8') as f:
+            recent = json.load(f)
+        return cls(name, recent['tracks'], recent['listings'])
+
+    def save(self) -> None:
+        p_recent = get_recency_path() / f'{self.name}.json'
+        p_partial = p_recent.with_suffix('.partial')
+        with recency_lock:
+            saved = RecentTracks.load(self.name)
+            now = time.time()
+            self.tracks = _decay(
+                _merge(saved.tracks, self.tracks),
+                self.ttl,
+                self.max_size,
+                now,
+            )
+            self.listings = _decay(
+                _merge(saved.listings, self.listings),
+                self.ttl,
+                None,
+                now,
+            )
+            with open(p_partial, 'w', encoding='utf-8') as f:
+                json.dump({'tracks': self.tracks, 'listings': self.listings}, f)
+            p_partial.replace(p_recent)
+        logging.debug(
+            f"Saved {len(self.tracks)} recent tracks for {self.name}"
+        )
+
+    def is_recent(self, videoId) -> bool:
+        return videoId in self.tracks
+
+    def use(self, videoId) -> None:
+        self.tracks[videoId] = time.time()
+
+    def is_exhausted(self, key) -> bool:
+        return key in self.listings
+
+    def exhaust(self, key, videoIds) -> None:
+        self.listings[key] = min(
+            (self.tracks[v] for v in videoIds if v in self.tracks),
+            default=time.time(),
+        )
@@ -0,0 +1,251 @@
+from pathlib import Path
+from array import array
+import mmap
+import json
+import sys
+
+from ytmb.utils import get_config, get_data_directory, parse_count
+
+
+MAGIC = b'YTMBSNAP'
+VERSION = 1
+NO_VALUE = 0xFFFFFFFF
+ARTIST_SEP = '\x1f'
+
+PLAYLIST_COLUMNS = (
+    'playlist_id',
+    'playlist_title',
+    'playlist_description',
+    'playlist_thumbnail',
+    'playlist_count',
+)
+TRACK_COLUMNS = (
+    'track_video_id',
+    'track_title',
+    'track_artists',
+    'track_album',
+    'track_set_video_id',
+    'track_duration',
+    'track_explicit',
+)
+
+def get_snapshots_path() -> Path:
+    return get_data_directory(get_config()['snapshot']['snapshots_path'])
+
+def name_to_path(name) -> Path:
+    return get_snapshots_path() / f'{name}.ytmbsnap'
+
+def is_existing_snapshot(name) -> bool:
+    return name_to_path(name).is_file()
+
+class StringTable:
+    def __init__(self) -> None:
+        self.__indices = {}
+        self.__blob = bytearray()
+        self.offsets = array('I', [0])
+
+    def intern(self, text) -> int:
+        if text is None:
+            return NO_VALUE
+        if (i := self.__indices.get(text)) is None:
+            i = self.__indices[text] = len(self.offsets) - 1
+            self.__blob += text.encode('utf-8')
+            self.offsets.append(len(self.__blob))
+        return i
+
+    def blob(self) -> bytes:
+        return bytes(self.__blob)
+
+def write_snapshot(p_snapshot: Path, libraries: dict[str, list]):
+    strings = StringTable()
+    columns = {c: array('I') for c in PLAYLIST_COLUMNS + TRACK_COLUMNS}
+    columns['playlist_tracks'] = array('I', [0])
+    users = {}
+    for name, library in libraries.items():
+        users[name] = [len(columns['playlist_id']), len(library)]
+        for playlist, tracks in library:
+            thumbnails = playlist.get('thumbnails') or [{}]
+            for column, value in zip(PLAYLIST_COLUMNS, (
+                strings.intern(playlist['playlistId']),
+                strings.intern(playlist.get('title')),
+                strings.intern(playlist.get('description')),
+                strings.intern(thumbnails[0].get('url')),
+                parse_count(playlist.get('count')),
+            )):
+                columns[column].append(NO_VALUE if value is None else value)
+            for track in tracks:
+                artists = ARTIST_SEP.join(
+                    a['name'] for a in track.get('artists') or []
+                )
+                album = (track.get('album') or {}).get('name')
+                duration = track.get('duration_seconds')
+                for column, value in zip(TRACK_COLUMNS, (
+                    strings.intern(track.get('videoId')),
+                    strings.intern(track.get('title')),
+                    strings.intern(artists),
+                    strings.intern(album),
+                    strings.intern(track.get('setVideoId')),
+                    NO_VALUE if duration is None else duration,
+                    int(bool(track.get('isExplicit'))),
+                )):
+                    columns[column].append(value)
+            columns['playlist_tracks'].append(len(columns['track_video_id']))
+    columns['string_offsets'] = strings.offsets
+
+    blob = strings.blob()
+    sections = {}
+    offset = 0
+    for column, values in columns.items():
+        sections[column] = [offset, len(values)]
+        offset += values.itemsize * len(values)
+    sections['string_blob'] = [offset, len(blob)]
+    header = json.dumps({
+        'version': VERSION,
+        'byteorder': sys.byteorder,
+        'users': users,
+        'sections': sections,
+    }).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % 4)
+
+    p_partial = p_snapshot.with_suffix('.partial')
+    with open(p_partial, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, 'little'))
+        f.write(header)
+        for values in columns.values():
+            values.tofile(f)
+        f.write(blob)
+    p_partial.replace(p_snapshot)
+
+class Snapshot:
+    def __init__(self, p_snapshot: Path) -> None:
+        """raises ValueError"""
+        self.path = p_snapshot
+        with open(p_snapshot, 'rb') as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.__map)
+        if view[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a snapshot")
+        header_start = len(MAGIC) + 4
+        header_size = int.from_bytes(view[len(MAGIC):header_start], 'little')
+        header = json.loads(bytes(view[header_start:header_start+header_size]))
+        if header['version'] != VERSION:
+            raise ValueError(f"Unsupported version {header['version']}")
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError("Snapshot written with a different byte order")
+        data = view[header_start+header_size:]
+        self.users: dict[str, list[int]] = header['users']
+        blob_start, blob_size = header['sections'].pop('string_blob')
+        self.__blob = data[blob_start:blob_start+blob_size]
+        self.__columns = {
+            column: data[start:start+4*count].cast('I')
+            for column, (start, count) in header['sections'].items()
+        }
+        self.__strings = {}
+        self.__playlist_rows = {}
+
+    @classmethod
+    def load(cls, name) -> 'Snapshot':
+        """raises ValueError"""
+        if not is_existing_snapshot(name):
+            raise ValueError("Snapshot not found")
+        return cls(name_to_path(name))
+
+    def string(self, i) -> str | None:
+        if i == NO_VALUE:
+            return None
+        if (text := self.__strings.get(i)) is None:
+            offsets = self.__columns['string_offsets']
+            text = self.__strings[i] = str(
+                self.__blob[offsets[i]:offsets[i+1]],
+                'utf-8',
+            )
+        return text
+
+    def names(self) -> list[str]:
+        return list(self.users)
+
+    def _rows(self, name) -> range:
+        """raises KeyError"""
+        start, count = self.users[name]
+        return range(start, start + count)
+
+    def _playlist(self, row) -> dict:
+        columns = self.__columns
+        thumbnail = self.string(columns['playlist_thumbnail'][row])
+        playlist = {
+            'playlistId': self.string(columns['playlist_id'][row]),
+            'title': self.string(columns['playlist_title'][row]),
+            'description': self.string(columns['playlist_description'][row]),
+            'thumbnails': [{'url': thumbnail}] if thumbnail else [],
+        }
+        if (count := columns['playlist_count'][row]) != NO_VALUE:
+            playlist['count'] = count
+        return playlist
+
+    def _track(self, row) -> dict:
+        columns = self.__columns
+        artists = self.string(columns['track_artists'][row])
+        album = self.string(columns['track_album'][row])
+        track = {
+            'videoId': self.string(columns['track_video_id'][row]),
+            'title': self.string(columns['track_title'][row]),
+            'artists': [
+                {'name': a, 'id': None}
+                for a in artists.split(ARTIST_SEP) if a
+            ],
+            'album': {'name': album, 'id': None} if album else None,
+            'setVideoId': self.string(columns['track_set_video_id'][row]),
+            'isExplicit': bool(columns['track_explicit'][row]),
+            'isAvailable': True,
+            'thumbnails': [],
+        }
+        if (duration := columns['track_duration'][row]) != NO_VALUE:
+            track['duration_seconds'] = duration
+            track['duration'] = f"{duration // 60}:{duration % 60:02}"
+        return track
+
+    def get_playlists(self, name) -> list[dict]:
+        """raises KeyError"""
+        return [self._playlist(row) for row in self._rows(name)]
+
+    def find_playlist(self, name, playlistId) -> int:
+        """raises KeyError"""
+        if name not in self.__playlist_rows:
+            ids = self.__columns['playlist_id']
+            self.__playlist_rows[name] = {
+                self.string(ids[row]): row for row in self._rows(name)
+            }
+        return self.__playlist_rows[name][playlistId]
+
+    def get_playlist(self, name, playlistId, limit=None) -> dict:
+        """raises KeyError"""
+        row = self.find_playlist(name, playlistId)
+        playlist = self._playlist(row)
+        boundaries = self.__columns['playlist_tracks']
+        rows = range(boundaries[row], boundaries[row+1])
+        return {
+            'id': playlistId,
+            'title': playlist['title'],
+            'description': playlist['description'],
+            'thumbnails': playlist['thumbnails'],
+            'trackCount': playlist.get('count', len(rows)),
+            'tracks': [self._track(r) for r in rows[:limit]],
+        }
+
+class SnapshotClient:
+    def __init__(self, user, snapshot: Snapshot) -> None:
+        self.__user = user
+        self.__snapshot = snapshot
+
+    def get_library_playlists(self, limit=None):
+        return self.__snapshot.get_playlists(self.__user)[:limit]
+
+    def get_playlist(self, playlistId, limit=100, **kwargs):
+        """raises KeyError"""
+        return self.__snapshot.get_playlist(self.__user, playlistId, limit)
+
+    def __getattr__(self, method):
+        def unavailable(*args, **kwargs):
+            raise RuntimeError(f"{method} is not available from a snapshot")
+        return unavailable
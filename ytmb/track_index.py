@@ -0,0 +1,119 @@
+import logging
+from typing import NamedTuple, Optional
+from pathlib import Path
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from ytmb.utils import get_config, get_data_directory, parse_count, tokenize
+import ytmb.authentication as auth
+import ytmb.playlists as pl
+
+
+class Location(NamedTuple):
+    user: str
+    playlistId: str
+    playlist_title: str
+
+class Hit(NamedTuple):
+    videoId: str
+    title: str
+    artists: str
+    location: Location
+
+def get_track_cache_path() -> Path:
+    return get_data_directory(get_config()['track_index']['cache_path'])
+
+def get_track_cache(name) -> dict:
+    p_cache = get_track_cache_path() / f'{name}.json'
+    if not p_cache.is_file():
+        return {}
+    with open(p_cache, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_track_cache(name, cache: dict):
+    p_cache = get_track_cache_path() / f'{name}.json'
+    p_partial = p_cache.with_suffix('.partial')
+    with open(p_partial, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, separators=(',', ':'))
+    p_partial.replace(p_cache)
+
+def format_artists(track) -> str:
+    return ', '.join(a['name'] for a in track.get('artists') or [])
+
+def update_track_cache(name) -> int:
+    cache = get_track_cache(name)
+    playlists = pl.get_playlists(name)
+    stale = [
+        p for p in playlists
+        if cache.get(p['playlistId'], {}).get('fingerprint')
+        != pl.playlist_fingerprint(p)
+    ]
+    max_workers = get_config()['track_index']['max_workers']
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        all_tracks = list(executor.map(
+            lambda p: pl.get_tracks(name, p),
+            stale,
+        ))
+    for playlist, tracks in zip(stale, all_tracks):
+        if not tracks and parse_count(playlist.get('count')):
+            logging.warning(f"No tracks found for {playlist['title']}")
+            continue
+        cache[playlist['playlistId']] = {
+            'title': playlist['title'],
+            'fingerprint': pl.playlist_fingerprint(playlist),
+            'tracks': [
+                [t['videoId'], t['title'], format_artists(t)]
+                for t in tracks if t.get('videoId')
+            ],
+        }
+    library_ids = {p['playlistId'] for p in playlists}
+    for playlistId in cache.keys() - library_ids:
+        del cache[playlistId]
+    write_track_cache(name, cache)
+    logging.debug(f"Refreshed {len(stale)} of {len(playlists)} playlists "
+                  f"for {name}")
+    return len(stale)
+
+class TrackIndex:
+    def __init__(self) -> None:
+        self.__tracks = {}
+        self.__locations = defaultdict(dict)
+        self.__tokens = defaultdict(set)
+
+    def add_playlist(self, location: Location, tracks) -> None:
+        for videoId, title, artists in tracks:
+            if videoId not in self.__tracks:
+                self.__tracks[videoId] = (title, artists)
+                for token in tokenize(f'{title} {artists}'):
+                    self.__tokens[token].add(videoId)
+            self.__locations[videoId][location] = None
+
+    def _hits(self, videoIds) -> list[Hit]:
+        return [
+            Hit(videoId, *self.__tracks[videoId], location)
+            for videoId in videoIds
+            for location in self.__locations[videoId]
+        ]
+
+    def find_video(self, videoId) -> list[Hit]:
+        if videoId not in self.__tracks:
+            return []
+        return self._hits([videoId])
+
+    def find(self, query) -> list[Hit]:
+        videoIds = None
+        for token in tokenize(query):
+            matches = self.__tokens.get(token, set())
+            videoIds = matches if videoIds is None else videoIds & matches
+        return self._hits(sorted(videoIds or ()))
+
+def load_track_index(names: Optional[list[str]]=None) -> TrackIndex:
+    index = TrackIndex()
+    for name in names or auth.get_header_names():
+        for playlistId, entry in get_track_cache(name).items():
+            index.add_playlist(
+                Location(name, playlistId, entry['title']),
+                entry['tracks'],
+            )
+    return index
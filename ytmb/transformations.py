@@ -0,0 +1,133 @@
+import re
+import random
+import unicodedata
+from typing import Optional, NamedTuple
+from collections.abc import Iterator
+
+from ytmb.utils import get_config
+
+
+NOISE_WORDS = (
+    'official', 'video', 'audio', 'lyric', 'lyrics', 'visualizer', 'mv',
+    'hd', 'hq', '4k', 'remaster', 'remastered', 'explicit', 'clean',
+    'music video', 'color coded',
+)
+
+BRACKETED = re.compile(r'[\(\[\{]([^\)\]\}]*)[\)\]\}]')
+FEATURING = re.compile(r'^\s*(?:feat|ft|featuring|with)\b')
+TRAILING_FEATURING = re.compile(r'\s(?:feat|ft|featuring)\b.*$')
+NOISE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(w) for w in NOISE_WORDS) + r'|\d{4})\b'
+)
+NON_WORD = re.compile(r'[\W_]+')
+ARTIST_SUFFIX = re.compile(r'(?:\s-\stopic|vevo)$')
+
+class TrackKey(NamedTuple):
+    title: str
+    artist: str
+
+def fold(text) -> str:
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+def collapse(text) -> str:
+    return NON_WORD.sub(' ', text).strip()
+
+def is_noise(text) -> bool:
+    return bool(FEATURING.match(text)) or not collapse(NOISE.sub('', text))
+
+def normalize_title(title, artist='') -> str:
+    title = BRACKETED.sub(
+        lambda m: ' ' if is_noise(m.group(1)) else m.group(0),
+        fold(title),
+    )
+    first, *rest = title.split(' - ')
+    parts = [first, *(p for p in rest if not is_noise(p))]
+    if len(parts) > 1 and collapse(first) == artist:
+        parts = parts[1:]
+    title = TRAILING_FEATURING.sub('', ' '.join(parts))
+    return collapse(title)
+
+def primary_artist(track) -> str:
+    artists = track.get('artists') or []
+    if not artists:
+        return ''
+    return collapse(ARTIST_SUFFIX.sub('', fold(artists[0]['name']).strip()))
+
+def track_key(track) -> TrackKey:
+    artist = primary_artist(track)
+    return TrackKey(normalize_title(track['title'], artist), artist)
+
+def get_duration(track) -> Optional[int]:
+    if (seconds := track.get('duration_seconds')) is not None:
+        return seconds
+    if not (duration := track.get('duration')):
+        return None
+    try:
+        seconds = 0
+        for part in duration.split(':'):
+            seconds = 60 * seconds + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+class DuplicateIndex:
+    def __init__(self) -> None:
+        self.tolerance = (
+            get_config()['transformations']['duration_tolerance']
+        )
+        self.groups: dict[TrackKey, list[tuple[Optional[int], list]]] = {}
+
+    def find(self, track) -> Optional[list]:
+        duration = get_duration(track)
+        for group_duration, group in self.groups.get(track_key(track), []):
+            if (duration is None
+                    or group_duration is None
+                    or abs(duration - group_duration) <= self.tolerance):
+                return group
+        return None
+
+    def add(self, track) -> list:
+        if (group := self.find(track)) is None:
+            group = []
+            self.groups.setdefault(track_key(track), []).append(
+                (get_duration(track), group)
+            )
+        group.append(track)
+        return group
+
+def group_duplicates(tracks) -> list[list]:
+    index = DuplicateIndex()
+    groups = []
+    for track in tracks:
+        if len(group := index.add(track)) == 1:
+            groups.append(group)
+    return groups
+
+def dedupe_tracks(tracks) -> list:
+    return [group[0] for group in group_duplicates(tracks)]
+
+def iter_unique(tracks, index: Optional[DuplicateIndex]=None) -> Iterator:
+    index = index or DuplicateIndex()
+    for track in tracks:
+        if len(index.add(track)) == 1:
+            yield track
+
+def spread_shuffle(tracks, rng: Optional[random.Random]=None) -> list:
+    rng = rng or random
+    groups: dict[str, list] = {}
+    positioned = []
+    for track in tracks:
+        if artist := primary_artist(track):
+            groups.setdefault(artist, []).append(track)
+        else:
+            positioned.append((rng.random(), track))
+    for group in groups.values():
+        rng.shuffle(group)
+        spacing = 1 / len(group)
+        offset = rng.random() * spacing
+        for i, track in enumerate(group):
+            jitter = rng.uniform(-0.1, 0.1) * spacing
+            positioned.append((offset + i * spacing + jitter, track))
+    positioned.sort(key=lambda pt: pt[0])
+    return [track for _, track in positioned]
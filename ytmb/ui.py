@@ -1,10 +1,11 @@
 import logging
 import warnings
-from typing import Any
+from typing import Any, Optional
 from dataclasses import dataclass
-from itertools import islice
+from collections import defaultdict
+from bisect import bisect_left
 
-from ytmb.utils import global_settings, get_config
+from ytmb.utils import global_settings, get_config, tokenize
 import ytmb.authentication as auth
 from ytmb.playlists import get_playlists, PrivacyStatus
 
@@ -27,22 +28,37 @@ class Action:
         return self.__desc
 
 class Pager:
-    def __init__(self, listings: dict={}) -> None:
-        self.__listings = listings
+    def __init__(self, listings: dict={}, page_size=None) -> None:
+        self.__listings = dict(listings)
+        self.__keys = list(self.__listings)
+        self.__view = self.__keys
+        self.__page_size = page_size or get_config()['ui']['menu_limit']
         self.__current_page = 0
 
     def __getitem__(self, key) -> Any:
         return self.__listings[key]
 
     def __setitem__(self, key, listing) -> None:
+        if key not in self.__listings:
+            self.__keys.append(key)
         self.__listings[key] = listing
 
+    def __len__(self) -> int:
+        return len(self.__view)
+
+    def items(self):
+        return self.__listings.items()
+
+    def filter(self, keys: Optional[list]=None) -> None:
+        self.__view = self.__keys if keys is None else list(keys)
+        self.__current_page = 0
+
     def at_first_page(self):
         return self.__current_page <= 0
 
     def at_last_page(self):
-        last_index = len(self.__listings) - 1
-        last_page = last_index // get_config()['ui']['menu_limit']
+        last_index = len(self.__view) - 1
+        last_page = last_index // self.__page_size
         return self.__current_page >= last_page
 
     def go_prev(self):
@@ -62,14 +78,12 @@ class Pager:
         raise StopIteration()
 
     def get_current_page(self) -> dict:
-        page_size = get_config()['ui']['menu_limit']
-        current_page_first_index = self.__current_page * page_size
+        current_page_first_index = self.__current_page * self.__page_size
         return {
-            key: listing for key, listing in islice(
-                self.__listings.items(),
-                current_page_first_index,
-                current_page_first_index + page_size
-            )
+            key: self.__listings[key] for key in self.__view[
+                current_page_first_index:
+                current_page_first_index + self.__page_size
+            ]
         }
 
     def get_current_page_with_navigation(
@@ -100,6 +114,33 @@ class Pager:
     def page_to_string(self, page) -> str:
         return '\n'.join(f'{k}: {l.desc}' for k, l in page.items())
 
+class SearchIndex:
+    def __init__(self, documents: dict) -> None:
+        postings = defaultdict(dict)
+        for key, text in documents.items():
+            for token in tokenize(text):
+                postings[token][key] = None
+        self.__postings = postings
+        self.__tokens = sorted(postings)
+        self.__order = {key: i for i, key in enumerate(documents)}
+
+    def _prefix_matches(self, prefix) -> set:
+        matches = set()
+        i = bisect_left(self.__tokens, prefix)
+        while i < len(self.__tokens) and self.__tokens[i].startswith(prefix):
+            matches.update(self.__postings[self.__tokens[i]])
+            i += 1
+        return matches
+
+    def search(self, query) -> list:
+        results = None
+        for prefix in tokenize(query):
+            matches = self._prefix_matches(prefix)
+            results = matches if results is None else results & matches
+        if results is None:
+            return list(self.__order)
+        return sorted(results, key=self.__order.__getitem__)
+
 class Selector:
     def __init__(
             self,
@@ -109,11 +150,13 @@ class Selector:
             redo="Please choose an option by its key.",
             prev_key='p',
             next_key='n',
+            search_key='/',
     ) -> None:
         self._prompt = prompt
         self._redo = redo
         self._prev_key = prev_key
         self._next_key = next_key
+        self._search_key = search_key
         if prev_key in choices:
             warnings.warn(
                 "A choice uses the same key as the prev action. Selector may "
@@ -124,8 +167,15 @@ class Selector:
                 "A choice uses the same key as the next action. Selector may "
                 "behave unexpectedly."
             )
+        if search_key in choices:
+            warnings.warn(
+                "A choice uses the same key as the search action. Selector may "
+                "behave unexpectedly."
+            )
         self._current_page = 0
         self.__pager = Pager(choices)
+        self.__search_index = None
+        self.__query = ''
 
     def __setitem__(self, key, choice: Choice) -> None:
         if key == self._prev_key:
@@ -138,13 +188,43 @@ class Selector:
                 "This action is being set to the same key as the next action. "
                 "Actions may behave unexpectedly."
             )
+        if key == self._search_key:
+            warnings.warn(
+                "This action is being set to the same key as the search "
+                "action. Actions may behave unexpectedly."
+            )
         self.__pager[key] = choice
+        self.__search_index = None
+
+    def search(self, query) -> None:
+        if self.__search_index is None:
+            self.__search_index = SearchIndex(
+                {k: c.desc for k, c in self.__pager.items()}
+            )
+        self.__query = query
+        self.__pager.filter(
+            self.__search_index.search(query) if query else None
+        )
+
+    def _user_search(self) -> None:
+        query = input("Search (leave blank to clear): ")
+        self.search(query)
+        if len(self.__pager) == 0:
+            print("No matches found.")
+            self.search('')
 
     def _get_current_choices(self) -> dict:
-        return self.__pager.get_current_page_with_navigation(
+        choices = self.__pager.get_current_page_with_navigation(
             self._prev_key,
             self._next_key,
         )
+        if self.__query or not (self.__pager.at_first_page()
+                                and self.__pager.at_last_page()):
+            desc = (f"Search (current: {self.__query})"
+                    if self.__query
+                    else "Search")
+            choices[self._search_key] = Action(self._user_search, desc)
+        return choices
 
     def user_choose(self) -> Any:
         while True:
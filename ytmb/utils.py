@@ -1,5 +1,5 @@
 import logging
-from typing import TypedDict
+from typing import TypedDict, Optional
 from pathlib import Path
 import re
 
@@ -8,6 +8,11 @@ import yaml
 
 global_settings = {
     'debug': False,
+    'cassette': None,
+    'replay': False,
+    'refresh_home': False,
+    'force': False,
+    'snapshot': None,
 }
 
 class UiConfig(TypedDict):
@@ -20,24 +25,75 @@ class FilteringConfig(TypedDict):
     blacklist_path: str
     whitelist_path: str
 
+class HomeCacheConfig(TypedDict):
+    cache_path: str
+    ttl: int
+
+class RecencyConfig(TypedDict):
+    recency_path: str
+    ttl_days: float
+    max_size: int
+
 class BlendConfig(TypedDict):
     default_length: int
     ask_for_length: bool
     filtering: FilteringConfig
+    home_cache: HomeCacheConfig
+    pipelined: bool
+    rotation_path: str
+    recency: RecencyConfig
+
+class PlaylistsConfig(TypedDict):
+    write_chunk_size: int
+    journal_path: str
+    vectorize_threshold: int
 
 class TrackingConfig(TypedDict):
     audits_path: str
+    history_path: str
+    max_workers: int
+
+class TrackIndexConfig(TypedDict):
+    cache_path: str
+    max_workers: int
+
+class TransformationsConfig(TypedDict):
+    duration_tolerance: int
+
+class AnalysisConfig(TypedDict):
+    sketches_path: str
+    minhash_permutations: int
+    taste_weight_floor: float
 
 class AutomationConfig(TypedDict):
     routines_path: str
+    fingerprints_path: str
+    max_workers: int
+
+class CassetteConfig(TypedDict):
+    cassettes_path: str
+
+class SnapshotConfig(TypedDict):
+    snapshots_path: str
+
+class LoggingConfig(TypedDict):
+    file_level: str
+    truncate_items: int
 
 class Config(TypedDict):
     data_path: str
     ui: UiConfig
+    logging: LoggingConfig
+    playlists: PlaylistsConfig
     authentication: AuthenticationConfig
     blend: BlendConfig
     tracking: TrackingConfig
+    track_index: TrackIndexConfig
+    transformations: TransformationsConfig
+    analysis: AnalysisConfig
     automation: AutomationConfig
+    cassette: CassetteConfig
+    snapshot: SnapshotConfig
 
 def get_app_root_path() -> Path:
     return Path(__file__).parent
@@ -69,3 +125,15 @@ def get_data_directory(name) -> Path:
 
 def is_ok_filename(name) -> bool:
     return bool(re.fullmatch(r'[A-Za-z0-9_\-]+', name))
+
+def parse_count(count) -> Optional[int]:
+    match count:
+        case int():
+            return count
+        case str() if (digits := count.replace(',', '')).isdigit():
+            return int(digits)
+        case _:
+            return None
+
+def tokenize(text) -> list[str]:
+    return re.findall(r'\w+', text.casefold())